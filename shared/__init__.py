@@ -0,0 +1 @@
+"""Modules used by both week_1 and week_2; install with `pip install -e .` from the repository root"""
@@ -0,0 +1,197 @@
+"""
+Record/replay cache for chat completions.
+
+Requests are keyed by a SHA-256 digest of their canonical JSON (model,
+messages, tools and every other parameter). Responses are stored as
+zlib-compressed JSON in SQLite and evicted least-recently-used once the
+store exceeds its size budget. Streamed responses are stored as their list
+of chunks and replayed chunk by chunk.
+
+Modes:
+    off     pass every request to the upstream
+    record  serve hits from the cache, send misses upstream and store them
+    replay  serve only from the cache; a miss raises CacheMiss (no upstream at all)
+
+    COMPLETION_CACHE=record python main.py     # fill the cache
+    COMPLETION_CACHE=replay python main.py     # run offline from it
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+MODES = ("off", "record", "replay")
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a request was never recorded"""
+
+
+def request_key(kwargs: Dict) -> str:
+    """Digest of a completion request; independent of dict key order"""
+    canonical = json.dumps(kwargs, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Size-bounded on-disk store of completion responses with hit-rate statistics"""
+
+    def __init__(self, path: str = "completion_cache.db", mode: str = "record", max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite database file
+            mode: "off", "record" or "replay"
+            max_bytes: Compressed size above which least recently used entries are evicted
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cache mode {mode!r}, expected one of {', '.join(MODES)}")
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        # All database access happens under the lock, so one connection serves every thread
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_by_last_used ON completions (last_used)")
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    @classmethod
+    def from_env(cls) -> Optional["CompletionCache"]:
+        """Build the cache from COMPLETION_CACHE (mode), COMPLETION_CACHE_PATH and COMPLETION_CACHE_MAX_MB"""
+        mode = os.getenv('COMPLETION_CACHE', 'off').lower()
+        if mode == "off":
+            return None
+        return cls(
+            os.getenv('COMPLETION_CACHE_PATH', 'completion_cache.db'),
+            mode,
+            int(float(os.getenv('COMPLETION_CACHE_MAX_MB', 256)) * 1024 * 1024),
+        )
+
+    def get(self, key: str):
+        """Return (kind, payload) for a key, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT kind, value FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["hits"] += 1
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (time.time(), key))
+        kind, value = row
+        return kind, json.loads(zlib.decompress(value))
+
+    def put(self, key: str, kind: str, payload):
+        """Store a response ("completion") or list of chunks ("stream"), evicting old entries if over budget"""
+        value = zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"), 6)
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, kind, value, size, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, value, len(value), time.time()),
+            )
+            self._bytes += len(value) - (previous[0] if previous else 0)
+            self._counters["stores"] += 1
+            if self._bytes > self.max_bytes:
+                self._evict(keep=key)
+
+    def _evict(self, keep: Optional[str] = None):
+        """
+        Delete least recently used entries until the store fits its budget; caller holds the lock
+
+        Args:
+            keep: Key never evicted (the entry just stored), even if it alone exceeds the budget
+        """
+        rows = self._conn.execute("SELECT key, size FROM completions ORDER BY last_used").fetchall()
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            doomed.append((key,))
+            self._bytes -= size
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", doomed)
+        self._counters["evictions"] += len(doomed)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return dict(self._counters, mode=self.mode, entries=entries, bytes=self._bytes,
+                        hit_rate=self._counters["hits"] / lookups if lookups else 0.0)
+
+    def wrap(self, client):
+        """Return a client whose chat.completions.create goes through this cache"""
+        return CachingClient(client, self)
+
+    def close(self):
+        self._conn.close()
+
+
+class CachingClient:
+    """
+    Stands in for an OpenAI client: chat.completions.create() is served from the
+    cache when possible; everything else is delegated to the wrapped client.
+    """
+
+    def __init__(self, client, cache: CompletionCache):
+        self._client = client
+        self.cache = cache
+        # Whether the latest create() was served from the cache (and so used no upstream tokens)
+        self.last_hit = False
+        self.chat = self
+        self.completions = self
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._client, name)
+
+    def with_options(self, **options):
+        return CachingClient(self._client.with_options(**options), self.cache)
+
+    def create(self, **kwargs):
+        if self.cache.mode == "off":
+            return self._client.chat.completions.create(**kwargs)
+
+        key = request_key(kwargs)
+        cached = self.cache.get(key)
+        self.last_hit = cached is not None
+        if cached is not None:
+            kind, payload = cached
+            if kind == "stream":
+                return iter([ChatCompletionChunk.model_validate(chunk) for chunk in payload])
+            return ChatCompletion.model_validate(payload)
+
+        if self.cache.mode == "replay":
+            raise CacheMiss(f"No recorded completion for request {key[:12]} (model {kwargs.get('model')})")
+
+        response = self._client.chat.completions.create(**kwargs)
+        if kwargs.get("stream"):
+            return self._record_stream(key, response)
+        self.cache.put(key, "completion", response.model_dump(mode="json", exclude_unset=True))
+        return response
+
+    def _record_stream(self, key, stream):
+        """Pass chunks through as they arrive and store them once the stream completes"""
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk.model_dump(mode="json", exclude_unset=True))
+            yield chunk
+        self.cache.put(key, "stream", chunks)
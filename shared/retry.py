@@ -0,0 +1,11 @@
+"""Classification of upstream errors shared by the week_1 batch runner and the week_2 call layer"""
+import openai
+
+
+def is_retryable(error):
+    """True for rate-limit, server-side, timeout and connection errors"""
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
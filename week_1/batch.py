@@ -0,0 +1,112 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from shared.retry import is_retryable
+
+class TokenBucket:
+    """Token bucket that refills continuously at `rate_per_minute` up to `capacity`"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available, then take them"""
+        # A single request larger than the bucket could never fit, so cap it
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimiter:
+    """Limits requests per minute and tokens per minute; a limit of 0 disables it"""
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def acquire(self, tokens=0):
+        if self.requests:
+            self.requests.acquire(1)
+        if self.tokens and tokens:
+            self.tokens.acquire(tokens)
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token) used for rate limiting"""
+    return len(text) // 4 + 1
+
+def with_retries(func, max_retries=5, base_delay=1.0, max_delay=60.0):
+    """Call `func`, retrying retryable errors with exponential backoff and jitter"""
+    for attempt in range(max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            time.sleep(random.uniform(0, delay))
+
+class RequestGate:
+    """
+    Admits every upstream request of a batch: rate limits, at most `concurrency`
+    requests in flight across all worker threads, and retries per request.
+    """
+
+    def __init__(self, concurrency, limiter=None, max_retries=5):
+        self.slots = threading.BoundedSemaphore(max(1, concurrency))
+        self.limiter = limiter or RateLimiter()
+        self.max_retries = max_retries
+
+    def call(self, func, tokens=0):
+        """Run `func` (one request); a retry waits for the rate limits and a slot again"""
+        def attempt():
+            self.limiter.acquire(tokens)
+            with self.slots:
+                return func()
+
+        return with_retries(attempt, max_retries=self.max_retries)
+
+def run_batch(tasks, worker, concurrency=4, report_every=10):
+    """
+    Run `worker(task)` for every task with at most `concurrency` requests in flight.
+
+    `worker` may return the number of tokens it used for the throughput report.
+    Returns a list of (task, error) pairs for the tasks that failed.
+    """
+    total = len(tasks)
+    done = 0
+    tokens = 0
+    failures = []
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(worker, task): task for task in tasks}
+        for future in as_completed(futures):
+            task = futures[future]
+            done += 1
+            try:
+                tokens += future.result() or 0
+            except Exception as e:
+                failures.append((task, e))
+            if done % report_every == 0 or done == total:
+                elapsed = time.monotonic() - start
+                rate = done / elapsed if elapsed else 0.0
+                token_rate = tokens / elapsed * 60 if elapsed else 0.0
+                print(f"[{done}/{total}] {rate:.2f} files/s, {token_rate:.0f} tokens/min, "
+                      f"{len(failures)} failed, {elapsed:.1f}s elapsed")
+
+    return failures
@@ -0,0 +1,57 @@
+import re
+import tiktoken
+
+# Lines such as "Sarah Johnson (10:00 AM): ..." start a new speaker turn
+SPEAKER_TURN = re.compile(r"^\s*[^:\n]{1,80}?(\([^)\n]*\))?\s*:")
+
+def get_encoding():
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text, encoding=None):
+    """Count the tokens in `text`"""
+    encoding = encoding or get_encoding()
+    return len(encoding.encode(text))
+
+def split_turns(text):
+    """Split a transcript into speaker turns, keeping continuation lines with their turn"""
+    turns = []
+    current = []
+    for line in text.splitlines(keepends=True):
+        if SPEAKER_TURN.match(line) and current:
+            turns.append("".join(current))
+            current = []
+        current.append(line)
+    if current:
+        turns.append("".join(current))
+    return turns
+
+def split_transcript(text, max_tokens, encoding=None):
+    """
+    Split a transcript into chunks of at most `max_tokens` tokens.
+
+    Chunks end on speaker-turn edges where possible; a single turn longer than
+    `max_tokens` is cut on token boundaries.
+    """
+    encoding = encoding or get_encoding()
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for turn in split_turns(text):
+        tokens = encoding.encode(turn)
+        if len(tokens) > max_tokens:
+            if current:
+                chunks.append("".join(current))
+                current, current_tokens = [], 0
+            for start in range(0, len(tokens), max_tokens):
+                chunks.append(encoding.decode(tokens[start:start + max_tokens]))
+            continue
+        if current_tokens + len(tokens) > max_tokens:
+            chunks.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(turn)
+        current_tokens += len(tokens)
+
+    if current:
+        chunks.append("".join(current))
+    return chunks
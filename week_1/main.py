@@ -1,8 +1,12 @@
 import os
-import json
+import argparse
 from pathlib import Path
 from dotenv import load_dotenv
 import openai
+from summarizer import MAX_CHUNK_TOKENS, PROMPT_VERSION, summarize_transcript, write_output
+from manifest import Manifest
+from batch import RateLimiter, RequestGate, run_batch
+from shared.completion_cache import CompletionCache
 
 # Load environment variables from .env file
 load_dotenv()
@@ -26,47 +30,111 @@ client = openai.OpenAI(
     api_key=api_key
 )
 
+# Record/replay cache for completions (COMPLETION_CACHE=record|replay, off by default)
+completion_cache = CompletionCache.from_env()
+if completion_cache:
+    client = completion_cache.wrap(client)
+
 # Create responses directory if it doesn't exist
 Path("responses").mkdir(exist_ok=True)
 
 # Process each .txt file in the test_cases folder
 test_cases_dir = "test_cases"
 responses_dir = "responses"
+manifest_path = os.path.join(responses_dir, "manifest.jsonl")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Summarize meeting transcripts in test_cases/")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv('BATCH_CONCURRENCY', 1)),
+                        help="Number of requests in flight (1 processes files one at a time)")
+    parser.add_argument("--rpm", type=int, default=int(os.getenv('BATCH_RPM', 0)),
+                        help="Requests per minute limit (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=int(os.getenv('BATCH_TPM', 0)),
+                        help="Tokens per minute limit (0 = unlimited)")
+    parser.add_argument("--max-retries", type=int, default=int(os.getenv('BATCH_MAX_RETRIES', 5)),
+                        help="Retries on 429/5xx and connection errors")
+    parser.add_argument("--max-chunk-tokens", type=int, default=int(os.getenv('MAX_CHUNK_TOKENS', MAX_CHUNK_TOKENS)),
+                        help="Transcripts longer than this are summarized with map-reduce")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-summarize every transcript, even if the manifest says it is up to date")
+    return parser.parse_args()
+
+def print_stats(filename, stats):
+    stages = ", ".join(
+        f"{stage}: {s['calls']} call(s), {s['prompt_tokens']}+{s['completion_tokens']} tokens, {s['max_call_seconds']:.1f}s max"
+        for stage, s in stats.items() if isinstance(s, dict)
+    )
+    print(f"{filename}: {stages}; {stats['total_seconds']:.1f}s total")
+
+def output_path_for(filename):
+    return os.path.join(responses_dir, os.path.splitext(filename)[0] + '.json')
+
+def find_pending(filenames, manifest, version, force):
+    """Return (filename, size, mtime_ns, digest) for every transcript that needs summarizing"""
+    pending = []
+    for filename in filenames:
+        input_path = os.path.join(test_cases_dir, filename)
+        size, mtime_ns, digest = manifest.input_state(input_path)
+        if not force and manifest.is_current(input_path, digest, version, model, output_path_for(filename)):
+            continue
+        pending.append((filename, size, mtime_ns, digest))
+    return pending
+
+def record(manifest, task, version):
+    filename, size, mtime_ns, digest = task
+    manifest.record(os.path.join(test_cases_dir, filename), size, mtime_ns, digest,
+                    version, model, output_path_for(filename))
+
+def run_tasks(tasks, args, manifest, version):
+    # Every completion (single, map, reduce) passes the same gate, so the RPM/TPM limits and
+    # the number of requests in flight hold across files and their chunks, and a failed
+    # chunk is retried on its own. --concurrency 1 is one worker taking the files in order,
+    # with the same limits and retries.
+    gate = RequestGate(args.concurrency, RateLimiter(args.rpm, args.tpm), args.max_retries)
+    # Retries are handled by the gate so they respect the rate limiter
+    batch_client = client.with_options(max_retries=0)
 
-for filename in os.listdir(test_cases_dir):
-    if filename.endswith('.txt'):
+    def process_file(task):
+        filename = task[0]
         input_path = os.path.join(test_cases_dir, filename)
-        output_filename = os.path.splitext(filename)[0] + '.json'
-        output_path = os.path.join(responses_dir, output_filename)
-        
-        try:
-            # Read the meeting transcript from file
-            with open(input_path, 'r', encoding='utf-8') as file:
-                text = file.read()
-            
-            # Create the prompt
-            prompt = f"""
-            Summarize the key points and action items from the following meeting transcript in a concise and organized manner. 
-            Focus on the main discussion points, decisions made, and specific tasks assigned to each attendee, including deadlines where applicable. 
-            The meeting transcript:\n\n{text}
-            """
-
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}]
-            )
-            
-            # Get the response content
-            result = response.choices[0].message.content
+        output_path = output_path_for(filename)
+        with open(input_path, 'r', encoding='utf-8') as file:
+            text = file.read()
+
+        result, stats = summarize_transcript(batch_client, model, text, args.max_chunk_tokens,
+                                             concurrency=args.concurrency, gate=gate)
+        write_output(output_path, result)
+        record(manifest, task, version)
+        if args.concurrency == 1:
+            # Files finish in order, so the summaries can be shown without interleaving
             print(result)
-            
-            # Write the result to a JSON file
-            with open(output_path, 'w', encoding='utf-8') as file:
-                json.dump(result, file, indent=2, ensure_ascii=False)
-                
-            print(f"Processed {filename} -> {output_filename}")
-            
-        except Exception as e:
-            print(f"Error processing {filename}: {str(e)}")
-
-print("\nAll files processed successfully!")
+        print_stats(filename, stats)
+        print(f"Processed {filename} -> {os.path.basename(output_path)}")
+        return sum(s["prompt_tokens"] + s["completion_tokens"] for s in stats.values() if isinstance(s, dict))
+
+    failures = run_batch(tasks, process_file, concurrency=args.concurrency)
+    for task, e in failures:
+        print(f"Error processing {task[0]}: {str(e)}")
+
+def main():
+    args = parse_args()
+    filenames = sorted(f for f in os.listdir(test_cases_dir) if f.endswith('.txt'))
+
+    # Outputs depend on the prompts and the chunking threshold
+    version = f"{PROMPT_VERSION}:{args.max_chunk_tokens}"
+    manifest = Manifest(manifest_path)
+    tasks = find_pending(filenames, manifest, version, args.force)
+    print(f"{len(filenames) - len(tasks)} of {len(filenames)} transcripts unchanged, skipping them")
+
+    run_tasks(tasks, args, manifest, version)
+    manifest.compact()
+
+    if completion_cache:
+        stats = completion_cache.stats()
+        print(f"\nCompletion cache ({stats['mode']}): {stats['hits']} hit(s), {stats['misses']} miss(es), "
+              f"{stats['hit_rate']:.0%} hit rate, {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB")
+
+    print("\nAll files processed successfully!")
+
+if __name__ == "__main__":
+    main()
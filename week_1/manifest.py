@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+def file_digest(path):
+    """SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def atomic_write_text(path, text):
+    """Write `text` to `path` through a temp file and rename, so readers never see a partial file"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+class Manifest:
+    """
+    Records, for each transcript, the input digest, prompt version, model and
+    output path of its last successful summary.
+
+    Entries are appended to a JSON-lines file as each file finishes, so an
+    interrupted run keeps everything completed so far; the latest line for a
+    file wins. `compact()` rewrites the file with one line per transcript.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-append can leave a truncated last line
+                    continue
+                self.entries[entry["input"]] = entry
+
+    def input_state(self, input_path):
+        """
+        Return (size, mtime_ns, digest) for an input file.
+
+        The digest is reused from the manifest when size and mtime are unchanged,
+        so unchanged files are never re-read.
+        """
+        stat = os.stat(input_path)
+        entry = self.entries.get(input_path)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return stat.st_size, stat.st_mtime_ns, entry["digest"]
+        return stat.st_size, stat.st_mtime_ns, file_digest(input_path)
+
+    def is_current(self, input_path, digest, prompt_version, model, output_path):
+        """True if `output_path` already holds a summary of this exact input, prompt and model"""
+        entry = self.entries.get(input_path)
+        return (
+            entry is not None
+            and entry["digest"] == digest
+            and entry["prompt_version"] == prompt_version
+            and entry["model"] == model
+            and entry["output"] == output_path
+            and os.path.exists(output_path)
+        )
+
+    def record(self, input_path, size, mtime_ns, digest, prompt_version, model, output_path):
+        """Append an entry for a transcript whose output has been written"""
+        entry = {
+            "input": input_path,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "digest": digest,
+            "prompt_version": prompt_version,
+            "model": model,
+            "output": output_path,
+        }
+        with self.lock:
+            self.entries[input_path] = entry
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def compact(self):
+        """Rewrite the manifest with only the latest entry per transcript"""
+        with self.lock:
+            text = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.entries.values())
+            atomic_write_text(self.path, text)
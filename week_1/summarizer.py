@@ -0,0 +1,209 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from chunking import get_encoding, split_transcript
+from batch import estimate_tokens
+from manifest import atomic_write_text
+
+# Prompt used to summarize a meeting transcript
+PROMPT_TEMPLATE = """
+            Summarize the key points and action items from the following meeting transcript in a concise and organized manner. 
+            Focus on the main discussion points, decisions made, and specific tasks assigned to each attendee, including deadlines where applicable. 
+            The meeting transcript:\n\n{text}
+            """
+
+# Map step: summarize one part of a long transcript
+MAP_PROMPT_TEMPLATE = """
+            The following is part {index} of {total} of a long meeting transcript.
+            Summarize the key points and decisions in this part, and list every action item with its owner and deadline exactly as stated.
+            Do not drop any action item or deadline, even minor ones.
+            Transcript part:\n\n{text}
+            """
+
+# Reduce step: merge the partial summaries into the final one
+REDUCE_PROMPT_TEMPLATE = """
+            The following are summaries of consecutive parts of one meeting transcript.
+            Merge them into a single concise and organized summary of the key points and action items.
+            Focus on the main discussion points, decisions made, and specific tasks assigned to each attendee, including deadlines where applicable.
+            Keep every action item and deadline from the partial summaries; merge duplicates instead of dropping them.
+            Partial summaries:\n\n{text}
+            """
+
+# Transcripts longer than this are summarized with map-reduce
+MAX_CHUNK_TOKENS = 6000
+# Intermediate reduce rounds allowed before the final merge
+MAX_REDUCE_ROUNDS = 3
+
+# Changes whenever a prompt changes, so stale outputs are redone
+PROMPT_VERSION = hashlib.sha256(
+    f"{PROMPT_TEMPLATE}{MAP_PROMPT_TEMPLATE}{REDUCE_PROMPT_TEMPLATE}".encode()
+).hexdigest()[:12]
+
+_stats_lock = threading.Lock()
+
+def build_prompt(text):
+    """Build the summarization prompt for a transcript"""
+    return PROMPT_TEMPLATE.format(text=text)
+
+def _complete(client, model, prompt, stats, stage, gate=None):
+    """
+    Run one completion and add its token usage and latency to `stats[stage]`
+
+    With a RequestGate the call is rate limited, counted against the shared
+    in-flight bound and retried on its own.
+    """
+    def create():
+        return client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}]
+        )
+
+    start = time.perf_counter()
+    response = gate.call(create, estimate_tokens(prompt)) if gate else create()
+    _record(stats, stage, response.usage, time.perf_counter() - start)
+    return response.choices[0].message.content
+
+def _record(stats, stage, usage, elapsed):
+    """Add one completion's token usage and latency to `stats[stage]`"""
+    with _stats_lock:
+        stage_stats = stats.setdefault(stage, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0, "max_call_seconds": 0.0,
+        })
+        stage_stats["calls"] += 1
+        if usage:
+            stage_stats["prompt_tokens"] += usage.prompt_tokens
+            stage_stats["completion_tokens"] += usage.completion_tokens
+        stage_stats["seconds"] += elapsed
+        stage_stats["max_call_seconds"] = max(stage_stats["max_call_seconds"], elapsed)
+
+def summarize(client, model, text):
+    """Summarize a transcript with a single completion and return the summary text"""
+    return _complete(client, model, build_prompt(text), {}, "single")
+
+def _complete_all(client, model, prompts, stats, stage, concurrency, gate=None):
+    """Run completions for several prompts in parallel, preserving their order"""
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(prompts)))) as executor:
+        return list(executor.map(lambda prompt: _complete(client, model, prompt, stats, stage, gate), prompts))
+
+def _join_parts(summaries):
+    return "\n\n".join(f"Part {i}:\n{summary}" for i, summary in enumerate(summaries, 1))
+
+def _final_prompt(client, model, text, stats, max_chunk_tokens, concurrency, gate=None):
+    """
+    Return (prompt, stage) for the last completion of a summary.
+
+    For long transcripts this runs the map stage and any intermediate reduce
+    rounds, leaving only the final merge to the caller.
+    """
+    encoding = get_encoding()
+    if len(encoding.encode(text)) <= max_chunk_tokens:
+        return build_prompt(text), "single"
+
+    # The map stage runs in parallel, so stats["map"]["seconds"] is the sum over calls
+    # while max_call_seconds approximates its wall-clock latency
+    chunks = split_transcript(text, max_chunk_tokens, encoding)
+    prompts = [
+        MAP_PROMPT_TEMPLATE.format(index=i, total=len(chunks), text=chunk)
+        for i, chunk in enumerate(chunks, 1)
+    ]
+    summaries = _complete_all(client, model, prompts, stats, "map", concurrency, gate)
+
+    # Merge groups of summaries until they fit in a single reduce prompt
+    for _ in range(MAX_REDUCE_ROUNDS):
+        groups = split_transcript(_join_parts(summaries), max_chunk_tokens, encoding)
+        if len(groups) == 1:
+            break
+        prompts = [REDUCE_PROMPT_TEMPLATE.format(text=group) for group in groups]
+        summaries = _complete_all(client, model, prompts, stats, "reduce", concurrency, gate)
+    return REDUCE_PROMPT_TEMPLATE.format(text=_join_parts(summaries)), "reduce"
+
+def summarize_transcript(client, model, text, max_chunk_tokens=MAX_CHUNK_TOKENS, concurrency=8, gate=None):
+    """
+    Summarize a transcript of any length.
+
+    Short transcripts use a single completion. Longer ones are split on speaker
+    turns, the chunks are summarized in parallel, and the chunk summaries are
+    merged in a reduce step (repeated while they still don't fit in one chunk).
+    Every completion goes through `gate` (a batch.RequestGate) if one is given.
+
+    Returns (summary, stats) where stats holds calls, tokens and seconds per stage.
+    """
+    stats = {}
+    start = time.perf_counter()
+    prompt, stage = _final_prompt(client, model, text, stats, max_chunk_tokens, concurrency, gate)
+    summary = _complete(client, model, prompt, stats, stage, gate)
+    stats["total_seconds"] = time.perf_counter() - start
+    return summary, stats
+
+def stream_summary(client, model, text, max_chunk_tokens=MAX_CHUNK_TOKENS, concurrency=8, stats=None):
+    """
+    Like summarize_transcript, but yield the final completion as text deltas while it is generated.
+
+    For long transcripts the map stage completes first; only the final merge is
+    streamed. Per-stage stats, including the streamed call and total_seconds,
+    are added to `stats` if given, the same way summarize_transcript reports them.
+    """
+    stats = stats if stats is not None else {}
+    start = time.perf_counter()
+    prompt, stage = _final_prompt(client, model, text, stats, max_chunk_tokens, concurrency)
+    call_start = time.perf_counter()
+    usage = None
+    stream = client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    try:
+        for chunk in stream:
+            # With include_usage the last chunk carries the usage and no choices
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        now = time.perf_counter()
+        _record(stats, stage, usage, now - call_start)
+        stats["total_seconds"] = now - start
+
+class SummaryCache:
+    """Thread-safe cache of summaries keyed by transcript digest and model, with TTL eviction"""
+
+    def __init__(self, ttl_seconds=3600, max_entries=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(text, model):
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        return f"{digest}:{model}:{PROMPT_VERSION}"
+
+    def get(self, text, model):
+        """Return the cached summary, or None if it is missing or expired"""
+        key = self.key(text, model)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            summary, expires_at = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            return summary
+
+    def put(self, text, model, summary):
+        with self.lock:
+            now = time.monotonic()
+            # Drop expired entries first, then the ones closest to expiry if still full
+            self.entries = {k: v for k, v in self.entries.items() if v[1] >= now}
+            while len(self.entries) >= self.max_entries:
+                del self.entries[min(self.entries, key=lambda k: self.entries[k][1])]
+            self.entries[self.key(text, model)] = (summary, now + self.ttl_seconds)
+
+def write_output(output_path, result):
+    """Atomically write a summary to its JSON output file"""
+    atomic_write_text(output_path, json.dumps(result, indent=2, ensure_ascii=False))
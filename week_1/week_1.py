@@ -1,11 +1,25 @@
+import time
 import openai
 import streamlit as st
+from summarizer import SummaryCache, stream_summary
 
-# Initialize OpenAI client
-client = openai.OpenAI(
-    base_url="https://aiportalapi.stu-platform.live/use",
-    api_key="sk-amNWISclq5ZTRgAcgOBXzw"
-)
+MODEL = "GPT-5-mini"
+
+# The client and its HTTP connection pool are created once and shared across reruns and sessions
+@st.cache_resource
+def get_client():
+    return openai.OpenAI(
+        base_url="https://aiportalapi.stu-platform.live/use",
+        api_key="sk-amNWISclq5ZTRgAcgOBXzw"
+    )
+
+# Summaries by transcript digest and model, shared across sessions, expiring after an hour
+@st.cache_resource
+def get_summary_cache():
+    return SummaryCache(ttl_seconds=3600)
+
+client = get_client()
+summary_cache = get_summary_cache()
 
 # Streamlit app title
 st.title("Meeting Transcript Summarizer")
@@ -16,23 +30,34 @@ user_input = st.text_area("Enter the meeting transcript or prompt:", height=200)
 # Button to submit the input
 if st.button("Summarize"):
     if user_input:
-        # Prepare the prompt
-        prompt = f"""
-        Summarize the key points and action items from the following meeting transcript in a concise and organized manner. 
-        Focus on the main discussion points, decisions made, and specific tasks assigned to each attendee, including deadlines where applicable. 
-        The meeting transcript:\n\n{user_input}
-        """
-
         try:
-            # Call the OpenAI API
-            response = client.chat.completions.create(
-                model="GPT-5-mini",
-                messages=[{"role": "user", "content": prompt}]
-            )
+            cached = summary_cache.get(user_input, MODEL)
 
             # Display the response
             st.subheader("Summary")
-            st.write(response.choices[0].message.content)
+            if cached is not None:
+                st.write(cached)
+                st.caption("⚡ Cache hit: served without calling the model")
+            else:
+                # Long transcripts are split and summarized with map-reduce; the final step is streamed
+                stats = {}
+                timing = {"start": time.perf_counter()}
+
+                def timed_stream():
+                    for delta in stream_summary(client, MODEL, user_input, stats=stats):
+                        timing.setdefault("first_token", time.perf_counter())
+                        yield delta
+
+                summary = st.write_stream(timed_stream())
+                timing["end"] = time.perf_counter()
+                summary_cache.put(user_input, MODEL, summary)
+
+                ttft = timing.get("first_token", timing["end"]) - timing["start"]
+                st.caption(f"Cache miss · time to first token {ttft:.2f}s · total {timing['end'] - timing['start']:.2f}s")
+
+                if stats:
+                    with st.expander("Token and latency details"):
+                        st.json(stats)
 
         except Exception as e:
             st.error(f"An error occurred: {str(e)}")
@@ -42,4 +67,4 @@ if st.button("Summarize"):
 # Optional: Add a clear button to reset the input
 if st.button("Clear"):
     st.session_state.user_input = ""
-    st.experimental_rerun()
\ No newline at end of file
+    st.experimental_rerun()
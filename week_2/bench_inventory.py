@@ -0,0 +1,100 @@
+"""
+Contention benchmark for asset reservations: many threads reserve random
+asset lists from a small stock until it runs out, then the run is checked
+for overselling.
+
+    python bench_inventory.py --threads 64 --stock 50
+    python bench_inventory.py --threads 64 --journal /tmp/inventory   # include journal writes
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+
+from inventory import Inventory
+from latency_stats import percentile
+
+
+def run(threads, items, stock, max_list, journal, compact_every, seed):
+    inventory = Inventory(journal, compact_every=compact_every)
+    names = [f"item{i}" for i in range(items)]
+    inventory.restock({name: stock for name in names})
+
+    reserved = {name: 0 for name in names}
+    latencies = []
+    record_lock = threading.Lock()
+    start_barrier = threading.Barrier(threads)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        local_latencies = []
+        local_reserved = {name: 0 for name in names}
+        failures_in_a_row = 0
+        start_barrier.wait()
+        # Keep going until requests keep failing, i.e. the stock is (nearly) exhausted
+        while failures_in_a_row < 20:
+            wanted = {name: rng.randint(1, 2) for name in rng.sample(names, rng.randint(1, max_list))}
+            started = time.perf_counter()
+            result = inventory.reserve(f"employee{index}", wanted)
+            local_latencies.append(time.perf_counter() - started)
+            if result["reserved"]:
+                failures_in_a_row = 0
+                for name, quantity in wanted.items():
+                    local_reserved[name] += quantity
+            else:
+                failures_in_a_row += 1
+        with record_lock:
+            latencies.extend(local_latencies)
+            for name, quantity in local_reserved.items():
+                reserved[name] += quantity
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    oversold = {name: reserved[name] - stock for name in names if reserved[name] > stock}
+    mismatched = {name: inventory.available(name) for name in names if inventory.available(name) != stock - reserved[name]}
+    inventory.close()
+    return {
+        "threads": threads,
+        "items": items,
+        "stock_per_item": stock,
+        "attempts": len(latencies),
+        "elapsed_seconds": elapsed,
+        "attempts_per_second": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_mean_us": statistics.fmean(latencies) * 1e6 if latencies else 0.0,
+        "latency_p50_us": percentile(latencies, 50) * 1e6,
+        "latency_p99_us": percentile(latencies, 99) * 1e6,
+        "stats": dict(inventory.stats),
+        "units_reserved": sum(reserved.values()),
+        "oversold": oversold,
+        "count_mismatches": mismatched,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent asset reservations")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--items", type=int, default=5, help="Distinct items in stock")
+    parser.add_argument("--stock", type=int, default=50, help="Initial stock per item")
+    parser.add_argument("--max-list", type=int, default=3, help="Largest number of distinct items per request")
+    parser.add_argument("--journal", help="Persist to this path prefix (default: in memory)")
+    parser.add_argument("--compact-every", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = run(args.threads, args.items, args.stock, min(args.max_list, args.items),
+                  args.journal, args.compact_every, args.seed)
+    print(json.dumps(results, indent=2))
+    if results["oversold"] or results["count_mismatches"]:
+        raise SystemExit("Inventory oversold or lost count under contention")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Offline benchmark of the office assistant against the local stub upstream.
+
+Measures per-turn overhead (turn time minus upstream time), policy retrieval
+latency, TTS real-time factor and memory, and writes the results as JSON so
+runs from different commits can be compared:
+
+    python benchmark.py --output bench.json
+    python benchmark.py --output bench_new.json --compare bench.json
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+# Conversations must not play audio while being timed
+os.environ.setdefault("AUDIO_ENABLED", "false")
+# Replayed conversations must not see bookings, requests or reservations from earlier runs
+os.environ.setdefault("BOOKINGS_DB", ":memory:")
+os.environ.setdefault("REQUESTS_DB", ":memory:")
+os.environ.setdefault("INVENTORY_PATH", "")
+
+import openai
+import telemetry
+from latency_stats import summarize
+from stub_server import StubOpenAIServer
+from upstream import resilient_caller
+import office_assistant
+from office_assistant import SYSTEM_PROMPT, tools, process_conversation
+
+
+class TimedClient:
+    """Wraps an OpenAI client and records how long each completion call took"""
+
+    def __init__(self, client):
+        self._client = client
+        self.durations = []
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = self._client.chat.completions.create(**kwargs)
+            if kwargs.get("stream"):
+                # Materialize the stream so its transfer time counts as upstream time
+                result = list(result)
+            return result
+        finally:
+            self.durations.append(time.perf_counter() - start)
+
+
+def read_conversation_inputs(file_path):
+    with open(file_path, "r", encoding="utf-8") as file:
+        return [line.strip() for line in file if line.strip()]
+
+
+def bench_conversations(client, model, test_cases_dir, repeat):
+    """Replay every test case and return per-turn overhead samples grouped by case"""
+    overheads = []
+    cases = {}
+    for filename in sorted(os.listdir(test_cases_dir)):
+        if not filename.endswith(".txt"):
+            continue
+        inputs = read_conversation_inputs(os.path.join(test_cases_dir, filename))
+        case_overheads = []
+        for run in range(repeat):
+            history = [{"role": "system", "content": SYSTEM_PROMPT}]
+            # A fresh employee per replay, so repeats are not rejected as duplicate requests
+            session_id = f"{filename}:{run}"
+            for user_message in inputs:
+                timed = TimedClient(client)
+                start = time.perf_counter()
+                history, _ = process_conversation(timed, model, history, user_message, tools, session_id=session_id)
+                turn = time.perf_counter() - start
+                case_overheads.append(max(0.0, turn - sum(timed.durations)))
+        cases[filename] = summarize(case_overheads)
+        overheads.extend(case_overheads)
+    return summarize(overheads), cases
+
+
+def bench_policy_retrieval(test_cases_dir, repeat):
+    """Time query_policy on the policy questions from case_5"""
+    questions = read_conversation_inputs(os.path.join(test_cases_dir, "case_5.txt"))
+    office_assistant.query_policy(questions[0])  # warm up the embedding model
+    samples = []
+    for _ in range(repeat):
+        for question in questions:
+            start = time.perf_counter()
+            office_assistant.query_policy(question)
+            samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_tts(sentences):
+    """Real-time factor (synthesis time / audio duration) of the default TTS model"""
+    try:
+        import soundfile as sf
+        from tts_module import get_tts_instance
+    except ImportError as e:
+        return {"error": f"TTS unavailable: {e}"}
+
+    tts = get_tts_instance()
+    if not tts.model:
+        return {"error": "TTS model not available"}
+
+    tts.text_to_speech(sentences[0])  # warm up
+    synth_seconds = 0.0
+    audio_seconds = 0.0
+    for sentence in sentences:
+        start = time.perf_counter()
+        path = tts.text_to_speech(sentence)
+        synth_seconds += time.perf_counter() - start
+        if path:
+            audio_seconds += sf.info(path).duration
+            tts.cleanup_temp_files(path)
+    return {
+        "synthesis_seconds": synth_seconds,
+        "audio_seconds": audio_seconds,
+        "real_time_factor": synth_seconds / audio_seconds if audio_seconds else None,
+    }
+
+
+def max_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Print metrics that got worse than the baseline by more than `tolerance` (a fraction)"""
+    checks = [
+        ("turn overhead p50", results["turn_overhead"]["p50_ms"], baseline["turn_overhead"]["p50_ms"]),
+        ("turn overhead p95", results["turn_overhead"]["p95_ms"], baseline["turn_overhead"]["p95_ms"]),
+        ("policy retrieval p50", results["policy_retrieval"]["p50_ms"], baseline["policy_retrieval"]["p50_ms"]),
+        ("max RSS", results["memory"]["max_rss_mb"], baseline["memory"]["max_rss_mb"]),
+    ]
+    if results["tts"].get("real_time_factor") and baseline.get("tts", {}).get("real_time_factor"):
+        checks.append(("TTS real-time factor", results["tts"]["real_time_factor"], baseline["tts"]["real_time_factor"]))
+
+    regressions = 0
+    for name, current, previous in checks:
+        if previous and current > previous * (1 + tolerance):
+            regressions += 1
+            print(f"REGRESSION {name}: {previous:.2f} -> {current:.2f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the office assistant against a local stub upstream")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub upstream latency in seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="Times to replay each conversation")
+    parser.add_argument("--test-cases", default="test_cases")
+    parser.add_argument("--skip-tts", action="store_true", help="Skip the TTS real-time factor benchmark")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before flagging a regression")
+    parser.add_argument("--spans", help="Also write every recorded timing span to this JSON-lines file")
+    args = parser.parse_args()
+
+    telemetry.enable()
+
+    rss_before = max_rss_mb()
+    with StubOpenAIServer(latency=args.latency) as stub:
+        client = openai.OpenAI(base_url=stub.base_url, api_key="stub", max_retries=0)
+        turn_overhead, cases = bench_conversations(client, "stub-model", args.test_cases, args.repeat)
+        upstream_requests = stub.request_count
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stub_latency_seconds": args.latency,
+        "upstream_requests": upstream_requests,
+        "turn_overhead": turn_overhead,
+        "turn_overhead_by_case": cases,
+        "policy_retrieval": bench_policy_retrieval(args.test_cases, args.repeat),
+        "tts": {"skipped": True} if args.skip_tts else bench_tts([
+            "Your day off request has been submitted.",
+            "Employees are entitled to twenty days of paid leave per calendar year.",
+        ]),
+        "memory": {"max_rss_mb": max_rss_mb(), "rss_growth_mb": max_rss_mb() - rss_before},
+        "stages": telemetry.summary(),
+    }
+    results["upstream"] = resilient_caller.stats()
+    if office_assistant.completion_cache:
+        results["completion_cache"] = office_assistant.completion_cache.stats()
+    if args.spans:
+        telemetry.export_jsonl(args.spans)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
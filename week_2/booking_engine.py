@@ -0,0 +1,296 @@
+"""
+Meeting-room booking engine: a per-room, per-date interval index with
+logarithmic conflict checks and free-slot search, persisted to SQLite
+"""
+import json
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Meetings must fit inside office hours
+DAY_START = "08:00"
+DAY_END = "18:00"
+
+
+def to_minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def to_hhmm(minutes: int) -> str:
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def load_rooms(path: str = "example_rooms.json") -> Optional[Dict[str, Dict]]:
+    """Load the room catalogue; returns None (any room id accepted) if the file is missing"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return {room["id"]: room for room in json.load(f)}
+    except FileNotFoundError:
+        return None
+
+
+class _RoomDay:
+    """Bookings of one room on one date, kept sorted by start. They never overlap, so ends are sorted too"""
+
+    __slots__ = ("starts", "ends", "ids")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.ids: List[int] = []
+
+    def overlapping(self, start: int, end: int) -> range:
+        """Positions of bookings overlapping [start, end): those starting before `end` and ending after `start`"""
+        return range(bisect_right(self.ends, start), bisect_left(self.starts, end))
+
+    def insert(self, start: int, end: int, booking_id: int):
+        position = bisect_left(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.ids.insert(position, booking_id)
+
+    def remove(self, booking_id: int):
+        position = self.ids.index(booking_id)
+        del self.starts[position], self.ends[position], self.ids[position]
+
+    def gaps(self, day_start: int, day_end: int) -> Iterable[Tuple[int, int]]:
+        """Free intervals between bookings within office hours"""
+        cursor = day_start
+        for start, end in zip(self.starts, self.ends):
+            if start > cursor:
+                yield cursor, min(start, day_end)
+            cursor = max(cursor, end)
+            if cursor >= day_end:
+                return
+        if cursor < day_end:
+            yield cursor, day_end
+
+
+class BookingEngine:
+    """
+    Books meeting rooms without double bookings.
+
+    Bookings are cached in an in-memory index of date -> room -> sorted
+    intervals, loaded from SQLite one date at a time, so a conflict check is
+    two binary searches. Free-slot search walks each candidate room's gaps and
+    stops early once enough rooms fit at the preferred time.
+
+    SQLite is the source of truth. Other processes (the CLI and the server, say)
+    may share the database: whenever another connection has committed, the cache
+    is dropped and reloaded. A booking re-checks the cache inside a BEGIN
+    IMMEDIATE transaction, which holds SQLite's write lock from the conflict check
+    to the insert, so two attempts on one slot cannot both succeed, whether they
+    come from threads or processes.
+    """
+
+    def __init__(self, path: str = "bookings.db", rooms: Optional[Dict[str, Dict]] = None,
+                 day_start: str = DAY_START, day_end: str = DAY_END):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway engine)
+            rooms: Room catalogue by id (None accepts any room id)
+            day_start: Earliest meeting start (HH:MM)
+            day_end: Latest meeting end (HH:MM)
+        """
+        self.rooms = rooms
+        self.day_start = to_minutes(day_start)
+        self.day_end = to_minutes(day_end)
+        self._index: Dict[str, Dict[str, _RoomDay]] = {}
+        self._bookings: Dict[int, Tuple[str, str, int, int, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        # All database access happens under the lock, so one connection serves all threads
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS bookings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                room_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                start_minute INTEGER NOT NULL,
+                end_minute INTEGER NOT NULL,
+                booked_by TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS bookings_by_date ON bookings (date, room_id)")
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self):
+        """Drop the cache if another connection committed since we last looked (caller holds the lock)"""
+        # data_version changes only for commits made by other connections
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._index.clear()
+            self._bookings.clear()
+
+    def _room_days(self, date: str) -> Dict[str, _RoomDay]:
+        """The index of one date, loaded from SQLite on first use (caller holds the lock)"""
+        by_room = self._index.get(date)
+        if by_room is None:
+            by_room = self._index[date] = {}
+            rows = self._conn.execute(
+                "SELECT id, room_id, start_minute, end_minute, booked_by FROM bookings WHERE date = ?", (date,)
+            ).fetchall()
+            for booking_id, room_id, start, end, booked_by in rows:
+                by_room.setdefault(room_id, _RoomDay()).insert(start, end, booking_id)
+                self._bookings[booking_id] = (room_id, date, start, end, booked_by)
+        return by_room
+
+    def _describe(self, booking_id: int) -> Dict:
+        room_id, date, start, end, booked_by = self._bookings[booking_id]
+        return {"id": booking_id, "room_id": room_id, "date": date,
+                "start_time": to_hhmm(start), "end_time": to_hhmm(end), "booked_by": booked_by}
+
+    def conflicts(self, room_id: str, date: str, start: int, end: int) -> List[Dict]:
+        """Bookings of a room overlapping [start, end) minutes on a date"""
+        with self._lock:
+            self._sync()
+            return self._conflicts(room_id, date, start, end)
+
+    def _conflicts(self, room_id, date, start, end):
+        room_day = self._room_days(date).get(room_id)
+        if room_day is None:
+            return []
+        return [self._describe(room_day.ids[i]) for i in room_day.overlapping(start, end)]
+
+    def free_slots(self, date: str, duration_minutes: int, preferred_start: Optional[int] = None,
+                   rooms: Optional[Iterable[str]] = None, limit: int = 5) -> List[Dict]:
+        """
+        Find free slots of a given length, nearest to `preferred_start` first
+
+        Args:
+            date: Date in YYYY-MM-DD format
+            duration_minutes: Length of the meeting
+            preferred_start: Minutes after midnight to search around (defaults to opening time)
+            rooms: Rooms to search (defaults to every room in the catalogue or index)
+            limit: Maximum number of slots returned
+
+        Returns:
+            Slots as {"room_id", "start_time", "end_time"}
+        """
+        with self._lock:
+            self._sync()
+            return self._free_slots(date, duration_minutes, preferred_start, rooms, limit)
+
+    def _free_slots(self, date, duration_minutes, preferred_start, rooms, limit):
+        if preferred_start is None:
+            preferred_start = self.day_start
+        by_room = self._room_days(date)
+        if rooms is None:
+            rooms = self.rooms if self.rooms is not None else by_room
+        candidates = []
+        exact = 0
+        for room_id in rooms:
+            room_day = by_room.get(room_id)
+            if room_day is None:
+                # Nothing booked: the preferred time (clamped to office hours) is free
+                gaps = [(self.day_start, self.day_end)]
+            else:
+                gaps = room_day.gaps(self.day_start, self.day_end)
+            for gap_start, gap_end in gaps:
+                if gap_end - gap_start < duration_minutes:
+                    continue
+                # Closest start to the preferred time that still fits in the gap
+                start = min(max(preferred_start, gap_start), gap_end - duration_minutes)
+                candidates.append((abs(start - preferred_start), start, room_id))
+                exact += start == preferred_start
+            # An exact fit can't be beaten; stop once enough rooms offer one
+            if exact >= limit:
+                break
+        candidates.sort()
+        return [{"room_id": room_id, "start_time": to_hhmm(start), "end_time": to_hhmm(start + duration_minutes)}
+                for _, start, room_id in candidates[:limit]]
+
+    def book(self, room_id: str, date: str, start_time: str, duration_hours: float,
+             booked_by: Optional[str] = None, alternatives: int = 3) -> Dict:
+        """
+        Book a room if it is free
+
+        Args:
+            room_id: Room identifier
+            date: Date in YYYY-MM-DD format
+            start_time: Start time in HH:MM format
+            duration_hours: Length of the meeting in hours
+            booked_by: Employee making the booking
+            alternatives: Number of alternative slots to suggest on failure
+
+        Returns:
+            {"booked": True, "booking": {...}} on success, otherwise
+            {"booked": False, "reason": ..., "conflicts": [...], "alternatives": [...]}
+        """
+        start = to_minutes(start_time)
+        end = start + round(duration_hours * 60)
+        duration = end - start
+
+        if self.rooms is not None and room_id not in self.rooms:
+            return {"booked": False, "reason": f"Room {room_id} does not exist", "conflicts": [],
+                    "alternatives": self.free_slots(date, duration, start, limit=alternatives)}
+
+        with self._lock:
+            # Hold SQLite's write lock from the conflict check to the insert, so no other
+            # process can book the slot in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync()
+                if start < self.day_start or end > self.day_end:
+                    reason = f"Meetings must be within office hours ({to_hhmm(self.day_start)}-{to_hhmm(self.day_end)})"
+                    conflicts = []
+                else:
+                    conflicts = self._conflicts(room_id, date, start, end)
+                    reason = f"Room {room_id} is already booked" if conflicts else None
+
+                if reason:
+                    self._conn.execute("ROLLBACK")
+                    # Prefer the same room at another time, then other rooms around the requested time
+                    same_room = self._free_slots(date, duration, start, [room_id], 1)
+                    others = self._free_slots(date, duration, start, None, alternatives + 1)
+                    suggestions = same_room + [slot for slot in others if slot not in same_room]
+                    return {"booked": False, "reason": reason, "conflicts": conflicts,
+                            "alternatives": suggestions[:alternatives]}
+
+                booking_id = self._conn.execute(
+                    "INSERT INTO bookings (room_id, date, start_minute, end_minute, booked_by, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (room_id, date, start, end, booked_by, time.time()),
+                ).lastrowid
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._room_days(date).setdefault(room_id, _RoomDay()).insert(start, end, booking_id)
+            self._bookings[booking_id] = (room_id, date, start, end, booked_by)
+            return {"booked": True, "booking": self._describe(booking_id)}
+
+    def cancel(self, booking_id: int) -> bool:
+        """Cancel a booking; returns False if it does not exist"""
+        with self._lock:
+            self._sync()
+            if not self._conn.execute("DELETE FROM bookings WHERE id = ?", (booking_id,)).rowcount:
+                return False
+            # Only dates that were looked at are cached
+            booking = self._bookings.pop(booking_id, None)
+            if booking is not None:
+                room_id, date, _, _, _ = booking
+                by_room = self._index[date]
+                by_room[room_id].remove(booking_id)
+                if not by_room[room_id].ids:
+                    del by_room[room_id]
+            return True
+
+    def bookings(self, date: str, room_id: Optional[str] = None) -> List[Dict]:
+        """Bookings on a date, optionally for one room"""
+        with self._lock:
+            self._sync()
+            by_room = self._room_days(date)
+            rooms = [room_id] if room_id is not None else sorted(by_room)
+            return [self._describe(booking_id) for room in rooms
+                    for booking_id in (by_room[room].ids if room in by_room else [])]
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,344 @@
+"""
+Asset inventory with all-or-nothing reservations under optimistic concurrency.
+
+Stock changes are appended to a JSON-lines journal (one short line per
+reservation, release or restock) and periodically compacted into a snapshot,
+so a reservation never rewrites the whole inventory. Processes sharing the
+files take an advisory lock on <path>.lock for each commit and first replay
+whatever the others appended.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): the files must not be shared between processes
+    fcntl = None
+
+_QUANTITY_RE = re.compile(r"^\s*(\d+)\s*x?\s+(.*)$")
+_ARTICLE_RE = re.compile(r"^(?:a|an|the|one|new)\s+")
+
+
+def _atomic_write_json(path, data):
+    """Write JSON through a temp file and rename, so readers never see a partial file"""
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def load_catalogue(path: str = "example_assets.json") -> List[Dict]:
+    """Load the asset catalogue; returns an empty list if the file is missing"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+class Inventory:
+    """
+    Per-item stock counts with atomic reservation of whole asset lists.
+
+    Each item's stock is an immutable (count, version) pair. A reservation
+    reads the pairs it needs without locking, checks availability, and then
+    commits only if none of those items changed in the meantime (compare and
+    swap on the versions); otherwise it retries against the fresh counts. The
+    commit step is a few dict assignments and one journal append, so
+    concurrent sessions rarely wait on each other and can never oversell.
+    Before the compare, entries other processes journaled are replayed, which
+    bumps the versions of the items they touched.
+    """
+
+    def __init__(self, path: Optional[str] = "inventory", compact_every: int = 1000, max_retries: int = 100):
+        """
+        Args:
+            path: Prefix of the snapshot (<path>.snapshot.json) and journal (<path>.journal.jsonl)
+                files; None keeps the inventory in memory only
+            compact_every: Journal entries that trigger a snapshot and journal truncation
+            max_retries: Optimistic commit attempts before giving up
+        """
+        self.path = path
+        self.compact_every = compact_every
+        self.max_retries = max_retries
+        self._stock: Dict[str, Tuple[int, int]] = {}
+        self._reservations: Dict[int, Dict] = {}
+        self._aliases: Dict[str, str] = {}
+        self._next_id = 1
+        self._seq = 0
+        self._journal_entries = 0
+        self._commit_lock = threading.Lock()
+        self.stats = {"commits": 0, "conflicts": 0, "rejections": 0}
+        self._journal = None
+        self._journal_inode = None
+        self._journal_offset = 0
+        self._lock_file = None
+        if path:
+            self._lock_file = open(f"{path}.lock", "a")
+            with self._exclusive():
+                pass
+
+    @contextmanager
+    def _exclusive(self):
+        """Hold the commit lock and the cross-process file lock, with other processes' changes replayed"""
+        with self._commit_lock:
+            if self._lock_file is None:
+                yield
+                return
+            if fcntl:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _refresh(self) -> bool:
+        """Replay changes other processes committed since we last looked; caller holds both locks"""
+        if self._lock_file is None:
+            return False
+        try:
+            inode = os.stat(f"{self.path}.journal.jsonl").st_ino
+        except FileNotFoundError:
+            inode = None
+        if inode is None or inode != self._journal_inode:
+            # First load, or another process compacted the journal into a new snapshot
+            self._load()
+            return True
+        return self._read_journal()
+
+    def _load(self):
+        """Rebuild the state from the snapshot and the journal; caller holds both locks"""
+        previous = self._stock
+        self._stock, self._reservations = {}, {}
+        self._next_id, self._seq, self._journal_entries = 1, 0, 0
+        snapshot_path = f"{self.path}.snapshot.json"
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._stock = {item: (count, 0) for item, count in snapshot["stock"].items()}
+            self._reservations = {int(rid): r for rid, r in snapshot["reservations"].items()}
+            self._next_id = snapshot["next_id"]
+            self._seq = snapshot["seq"]
+
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(f"{self.path}.journal.jsonl", "ab+")
+        self._journal_inode = os.fstat(self._journal.fileno()).st_ino
+        self._journal_offset = 0
+        self._read_journal()
+        # Versions only grow, so a reservation that read the old state can't commit against the reloaded one
+        self._stock = {item: (count, previous.get(item, (0, 0))[1] + version + 1)
+                       for item, (count, version) in self._stock.items()}
+
+    def _read_journal(self) -> bool:
+        """Apply journal entries appended since the last read; returns whether there were any"""
+        self._journal.seek(self._journal_offset)
+        data = self._journal.read()
+        self._journal_offset += len(data)
+        for line in data.splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash mid-append can leave a truncated line
+                continue
+            # Entries already folded into the snapshot are skipped
+            if entry["seq"] <= self._seq:
+                continue
+            self._apply(entry)
+            self._seq = entry["seq"]
+            self._journal_entries += 1
+        return bool(data)
+
+    def _apply(self, entry: Dict):
+        """Replay one journal entry onto the in-memory state"""
+        sign = {"reserve": -1, "release": 1, "restock": 1}[entry["op"]]
+        for item, quantity in entry["items"].items():
+            count, version = self._stock.get(item, (0, 0))
+            self._stock[item] = (count + sign * quantity, version + 1)
+        if entry["op"] == "reserve":
+            self._reservations[entry["id"]] = {"employee": entry["employee"], "items": entry["items"]}
+            self._next_id = max(self._next_id, entry["id"] + 1)
+        elif entry["op"] == "release":
+            self._reservations.pop(entry["id"], None)
+
+    def _append(self, entry: Dict):
+        """Journal a committed change; caller holds the commit lock (and the file lock)"""
+        self._seq += 1
+        if self._journal is None:
+            return
+        entry["seq"] = self._seq
+        line = (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8")
+        self._journal.write(line)
+        self._journal.flush()
+        self._journal_offset += len(line)
+        self._journal_entries += 1
+        if self._journal_entries >= self.compact_every:
+            self._compact()
+
+    def _compact(self):
+        """Fold the journal into a new snapshot; caller holds the commit lock (and the file lock)"""
+        journal_path = f"{self.path}.journal.jsonl"
+        _atomic_write_json(f"{self.path}.snapshot.json", {
+            "seq": self._seq,
+            "next_id": self._next_id,
+            "stock": {item: count for item, (count, _) in self._stock.items()},
+            "reservations": self._reservations,
+        })
+        # Replace the journal instead of truncating it: other processes see a new file and reload the snapshot
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(journal_path) or ".", prefix=".tmp_",
+                                         suffix=os.path.basename(journal_path))
+        os.close(fd)
+        os.replace(temp_path, journal_path)
+        self._journal.close()
+        self._journal = open(journal_path, "ab+")
+        self._journal_inode = os.fstat(self._journal.fileno()).st_ino
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    def add_aliases(self, catalogue: Iterable[Dict]):
+        """Register catalogue ids, names and aliases for name resolution"""
+        for entry in catalogue:
+            for name in [entry["id"], entry.get("name", "")] + entry.get("aliases", []):
+                if name:
+                    self._aliases[name.lower()] = entry["id"]
+
+    def import_catalogue(self, catalogue: Iterable[Dict]):
+        """Register a catalogue and stock the items not in the inventory yet with their initial counts"""
+        catalogue = list(catalogue)
+        self.add_aliases(catalogue)
+        with self._exclusive():
+            missing = {entry["id"]: entry.get("stock", 0) for entry in catalogue if entry["id"] not in self._stock}
+            if missing:
+                self._restock(missing)
+
+    def resolve(self, name: str) -> Tuple[Optional[str], int]:
+        """
+        Map a free-text asset name such as "2 monitors" or "a Laptop" to (item id, quantity)
+
+        Returns:
+            (None, quantity) if the name matches no known item
+        """
+        text = name.strip().lower()
+        quantity = 1
+        match = _QUANTITY_RE.match(text)
+        if match:
+            quantity, text = int(match.group(1)), match.group(2)
+        text = _ARTICLE_RE.sub("", text).strip()
+        candidates = [text]
+        if text.endswith("es"):
+            candidates.append(text[:-2])
+        if text.endswith("s"):
+            candidates.append(text[:-1])
+        for candidate in candidates:
+            item = self._aliases.get(candidate) or (candidate if candidate in self._stock else None)
+            if item:
+                return item, quantity
+        return None, quantity
+
+    def available(self, item: str) -> int:
+        return self._stock.get(item, (0, 0))[0]
+
+    def _changed(self, seen: Dict[str, Tuple[int, int]]) -> bool:
+        """Whether any item's version moved since `seen` was read; caller holds the commit lock"""
+        return any(self._stock.get(item, (0, 0))[1] != version for item, (_, version) in seen.items())
+
+    def reserve(self, employee_id: str, items: Dict[str, int]) -> Dict:
+        """
+        Reserve every requested item or none of them
+
+        Args:
+            employee_id: Employee the assets are for
+            items: item id -> quantity (each at least 1)
+
+        Returns:
+            {"reserved": True, "reservation_id": int} or
+            {"reserved": False, "shortages": {item: {"requested", "available"}}}
+        """
+        if any(quantity < 1 for quantity in items.values()):
+            raise ValueError("Quantities must be at least 1")
+        for _ in range(self.max_retries):
+            # Optimistic read: no lock, just the current (count, version) pairs
+            seen = {item: self._stock.get(item, (0, 0)) for item in items}
+            shortages = {
+                item: {"requested": quantity, "available": seen[item][0]}
+                for item, quantity in items.items() if seen[item][0] < quantity
+            }
+            if shortages:
+                with self._exclusive():
+                    if not self._changed(seen):
+                        self.stats["rejections"] += 1
+                        return {"reserved": False, "shortages": shortages}
+                # Another thread or process changed these items (e.g. restocked them); check the fresh counts
+                continue
+
+            with self._exclusive():
+                if self._changed(seen):
+                    # Another reservation or restock touched these items; retry on fresh counts
+                    self.stats["conflicts"] += 1
+                    continue
+                for item, quantity in items.items():
+                    count, version = seen[item]
+                    self._stock[item] = (count - quantity, version + 1)
+                reservation_id = self._next_id
+                self._next_id += 1
+                self._reservations[reservation_id] = {"employee": employee_id, "items": dict(items)}
+                self._append({"op": "reserve", "id": reservation_id, "employee": employee_id,
+                              "items": items, "ts": time.time()})
+                self.stats["commits"] += 1
+                return {"reserved": True, "reservation_id": reservation_id}
+        raise RuntimeError(f"Reservation did not commit after {self.max_retries} attempts")
+
+    def release(self, reservation_id: int) -> bool:
+        """Return a reservation's items to stock; returns False if it does not exist"""
+        with self._exclusive():
+            reservation = self._reservations.pop(reservation_id, None)
+            if reservation is None:
+                return False
+            for item, quantity in reservation["items"].items():
+                count, version = self._stock.get(item, (0, 0))
+                self._stock[item] = (count + quantity, version + 1)
+            self._append({"op": "release", "id": reservation_id, "items": reservation["items"], "ts": time.time()})
+            return True
+
+    def restock(self, items: Dict[str, int]):
+        """Add stock for many items in one journal entry"""
+        with self._exclusive():
+            self._restock(items)
+
+    def _restock(self, items: Dict[str, int]):
+        """Caller holds the commit lock (and the file lock)"""
+        for item, quantity in items.items():
+            count, version = self._stock.get(item, (0, 0))
+            self._stock[item] = (count + quantity, version + 1)
+        self._append({"op": "restock", "items": dict(items), "ts": time.time()})
+
+    def reservations(self, employee_id: Optional[str] = None) -> Dict[int, Dict]:
+        with self._exclusive():
+            return {rid: dict(r) for rid, r in self._reservations.items()
+                    if employee_id is None or r["employee"] == employee_id}
+
+    def close(self):
+        with self._commit_lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
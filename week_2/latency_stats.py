@@ -0,0 +1,42 @@
+"""
+Latency summaries shared by the benchmark, load generator and inventory
+contention scripts, so their reports use the same percentile definition.
+"""
+import statistics
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of samples.
+
+    Args:
+        values: Samples in any order
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The sample at that rank, or 0.0 when there are no samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(values):
+    """
+    Summarize latency samples in seconds as milliseconds.
+
+    Args:
+        values: Latencies in seconds
+
+    Returns:
+        dict: count, mean, p50, p95, p99 and max (in ms)
+    """
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values) * 1000 if values else 0.0,
+    }
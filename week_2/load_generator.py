@@ -0,0 +1,243 @@
+"""
+Load generator: replays the scripted conversations in test_cases/ as many
+simulated employees talking to the assistant's HTTP server in parallel.
+
+Employees arrive as a Poisson process whose rate ramps up linearly to
+--rate over --ramp-up seconds and then holds until --duration. Each one
+replays a random test case turn by turn on its own connection. By default an
+in-process server backed by the local stub upstream is started; --target
+points at a running server.py instead. Turns answered with an "Error..."
+reply (e.g. the over-long message in case_4) count as "error reply" errors,
+next to HTTP and connection failures.
+
+    python load_generator.py --rate 5 --ramp-up 10 --duration 60
+    python load_generator.py --target http://127.0.0.1:8000 --rate 20 --stream
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from latency_stats import summarize
+
+
+def load_conversations(test_cases_dir):
+    conversations = {}
+    for filename in sorted(os.listdir(test_cases_dir)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(test_cases_dir, filename), "r", encoding="utf-8") as file:
+                conversations[filename] = [line.strip() for line in file if line.strip()]
+    return conversations
+
+
+def arrival_times(rate, ramp_up, duration, rng):
+    """Poisson arrival offsets (seconds) with the rate ramping linearly from 0 to `rate` over `ramp_up`"""
+    times = []
+    t = 0.0
+    while True:
+        # Thinning: draw at the peak rate and keep each arrival with probability rate(t) / peak
+        t += rng.expovariate(rate)
+        if t >= duration:
+            return times
+        if ramp_up <= 0 or t >= ramp_up or rng.random() < t / ramp_up:
+            times.append(t)
+
+
+class Results:
+    """Thread-safe collection of per-turn outcomes"""
+
+    def __init__(self):
+        self.latencies = []
+        self.first_delta = []
+        self.errors = {}
+        self.turns = 0
+        self.conversations = 0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def turn(self, latency, first_delta=None, error=None):
+        with self._lock:
+            self.turns += 1
+            if error:
+                self.errors[error] = self.errors.get(error, 0) + 1
+            else:
+                self.latencies.append(latency)
+                if first_delta is not None:
+                    self.first_delta.append(first_delta)
+
+    def started(self):
+        with self._lock:
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+
+    def finished(self):
+        with self._lock:
+            self.active -= 1
+            self.conversations += 1
+
+
+def chat(connection, payload, stream):
+    """Send one turn; returns (reply, seconds to first delta or None, error or None)"""
+    start = time.perf_counter()
+    connection.request("POST", "/chat", body=json.dumps(payload), headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    if response.status != 200:
+        response.read()
+        return None, None, f"HTTP {response.status}"
+    if not stream:
+        return json.loads(response.read())["reply"], None, None
+
+    first_delta = None
+    event = None
+    for raw in response:
+        line = raw.decode("utf-8").rstrip("\n")
+        if line.startswith("event: "):
+            event = line[7:]
+        elif line.startswith("data: "):
+            data = json.loads(line[6:])
+            if event == "delta" and first_delta is None:
+                first_delta = time.perf_counter() - start
+            elif event == "done":
+                response.read()
+                return data["reply"], first_delta, None
+            elif event == "error":
+                return None, first_delta, "stream error"
+    return None, first_delta, "stream ended early"
+
+
+def simulate_employee(target, employee, turns, stream, think_time, results):
+    """Replay one conversation as one employee on its own keep-alive connection"""
+    url = urlparse(target)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=120)
+    results.started()
+    try:
+        for user_message in turns:
+            payload = {"user_id": employee, "session_id": "load", "message": user_message, "stream": stream}
+            start = time.perf_counter()
+            try:
+                reply, first_delta, error = chat(connection, payload, stream)
+                if stream:
+                    # The server closes streamed responses; reconnect for the next turn
+                    connection.close()
+            except (OSError, http.client.HTTPException) as e:
+                reply, first_delta, error = None, None, type(e).__name__
+                connection.close()
+            if error is None and reply and reply.startswith(("Error", "API error")):
+                error = "error reply"
+            results.turn(time.perf_counter() - start, first_delta, error)
+            if think_time:
+                time.sleep(think_time)
+    finally:
+        connection.close()
+        results.finished()
+
+
+def start_local_server(stub_latency, stub_token_latency, failure_rate):
+    """Start the stub upstream and an in-process assistant server; returns (target URL, cleanup)"""
+    # In-process runs keep every store in memory and never synthesize audio
+    for key, value in (("AUDIO_ENABLED", "false"), ("BOOKINGS_DB", ":memory:"),
+                       ("REQUESTS_DB", ":memory:"), ("INVENTORY_PATH", "")):
+        os.environ.setdefault(key, value)
+    from stub_server import StubOpenAIServer
+    from upstream import create_client
+    from session_store import SessionStore
+    from server import AssistantServer
+    from office_assistant import SYSTEM_PROMPT
+
+    stub = StubOpenAIServer(latency=stub_latency, token_latency=stub_token_latency,
+                            failure_rate=failure_rate).start()
+    tmpdir = tempfile.TemporaryDirectory()
+    session_store = SessionStore(os.path.join(tmpdir.name, "sessions.db"), system_prompt=SYSTEM_PROMPT)
+    assistant = AssistantServer(create_client(stub.base_url, "stub", max_retries=0), "stub-model", session_store)
+    httpd = assistant.serve("127.0.0.1", 0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    def cleanup():
+        httpd.shutdown()
+        httpd.server_close()
+        session_store.close()
+        stub.stop()
+        tmpdir.cleanup()
+
+    return f"http://127.0.0.1:{httpd.server_address[1]}", cleanup
+
+
+def run(target, conversations, rate, ramp_up, duration, max_users, think_time, stream, seed):
+    rng = random.Random(seed)
+    arrivals = arrival_times(rate, ramp_up, duration, rng)
+    results = Results()
+    names = sorted(conversations)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_users) as pool:
+        for index, offset in enumerate(arrivals):
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            turns = conversations[rng.choice(names)]
+            pool.submit(simulate_employee, target, f"employee-{index}", turns, stream, think_time, results)
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "target": target,
+        "arrival_rate_per_second": rate,
+        "ramp_up_seconds": ramp_up,
+        "arrivals": len(arrivals),
+        "conversations_completed": results.conversations,
+        "peak_concurrent_employees": results.peak_active,
+        "elapsed_seconds": elapsed,
+        "turns": results.turns,
+        "throughput_turns_per_second": results.turns / elapsed if elapsed else 0.0,
+        "error_rate": sum(results.errors.values()) / results.turns if results.turns else 0.0,
+        "errors": results.errors,
+        "turn_latency": summarize(results.latencies),
+    }
+    if stream:
+        report["time_to_first_delta"] = summarize(results.first_delta)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay test conversations as many concurrent employees")
+    parser.add_argument("--target", help="Base URL of a running server.py (default: start one in-process)")
+    parser.add_argument("--rate", type=float, default=5.0, help="New employees per second at full load")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Seconds to ramp the arrival rate up to --rate")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds during which employees arrive")
+    parser.add_argument("--max-users", type=int, default=256, help="Maximum employees in flight at once")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Seconds an employee waits between turns")
+    parser.add_argument("--stream", action="store_true", help="Request SSE responses and time the first delta")
+    parser.add_argument("--test-cases", default="test_cases")
+    parser.add_argument("--stub-latency", type=float, default=0.2, help="In-process stub latency in seconds")
+    parser.add_argument("--stub-token-latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of stub requests failing with HTTP 500")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    conversations = load_conversations(args.test_cases)
+    cleanup = None
+    target = args.target
+    if not target:
+        target, cleanup = start_local_server(args.stub_latency, args.stub_token_latency, args.failure_rate)
+    try:
+        report = run(target, conversations, args.rate, args.ramp_up, args.duration, args.max_users,
+                     args.think_time, args.stream, args.seed)
+    finally:
+        if cleanup:
+            cleanup()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
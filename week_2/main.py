@@ -1,35 +1,20 @@
 import os
-from dotenv import load_dotenv
-import openai
 from office_assistant import SYSTEM_PROMPT, tools, process_conversation
+from session_store import SessionStore
+from upstream import load_config, create_client
 
-# Load environment variables from .env file
-load_dotenv()
+# Read configuration from environment variables (.env is loaded by upstream)
+model, base_url, api_key = load_config()
 
-# Read configuration from environment variables
-model = os.getenv('MODEL')
-base_url = os.getenv('OPENAI_BASE_URL')
-api_key = os.getenv('OPENAI_API_KEY')
-if not model:
-    raise ValueError("MODEL is not set in .env file")
-if not base_url:
-    raise ValueError("OPENAI_BASE_URL is not set in .env file")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY is not set in .env file")
+client = create_client(base_url, api_key)
 
-client = openai.OpenAI(
-    base_url=base_url,
-    api_key=api_key
-)
+# Conversation histories survive restarts in a local SQLite database
+session_store = SessionStore(os.getenv('SESSION_DB', 'sessions.db'), system_prompt=SYSTEM_PROMPT)
+session_id = os.getenv('SESSION_ID', 'cli')
 
 def main():
-    # Initialize conversation history
-    conversation_history = [
-        {
-            "role": "system",
-            "content": SYSTEM_PROMPT
-        }
-    ]
+    # Resume the saved conversation history, or start one with the system prompt
+    conversation_history = session_store.get(session_id)
 
     print("""
 === Office Assistant ===
@@ -45,12 +30,15 @@ I can help you with:
 💡 Tip: Add words like 'audio', 'voice', or 'speak' to your request for audio responses
 Type your request (or 'exit' to quit):
 """)
+    if len(conversation_history) > 1:
+        print(f"Resuming session '{session_id}' ({len(conversation_history) - 1} earlier messages)\n")
     
     while True:
         # Read user input from CLI
         user_message = input("You: ").strip()
         
         if user_message.lower() == 'exit':
+            session_store.close()
             print("Goodbye!")
             break
         
@@ -62,7 +50,10 @@ Type your request (or 'exit' to quit):
         
         # Process the user message
         try:
-            conversation_history, final_content = process_conversation(client, model, conversation_history, user_message, tools)
+            conversation_history, final_content = process_conversation(
+                client, model, conversation_history, user_message, tools, session_id=session_id
+            )
+            session_store.save(session_id, conversation_history)
             print(f"Assistant: {final_content or 'No response generated'}\n")
         except Exception as e:
             print(f"Error processing request: {str(e)}\n")
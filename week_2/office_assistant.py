@@ -1,10 +1,20 @@
 import json
 import openai
 import os
+import time
+from types import SimpleNamespace
 from dotenv import load_dotenv
 import tiktoken
-from tts_module import text_to_speech
+from tts_module import SentenceSplitter, StreamingSpeaker
+from telemetry import span, record
+from usage_ledger import ledger
 from policy_retriever import PolicyRetriever
+from tool_registry import ToolRegistry, Param
+from booking_engine import BookingEngine, load_rooms
+from request_ledger import RequestLedger, current_employee
+from inventory import Inventory, load_catalogue
+from shared.completion_cache import CompletionCache, CacheMiss
+from upstream import ResilientClient, Deadline, UpstreamUnavailable, resilient_caller, TURN_DEADLINE
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,9 +23,25 @@ MAX_TOKENS = int(os.getenv('MAX_TOKENS', 200))
 if not MAX_TOKENS:
     raise ValueError("MAX_TOKENS is not set in .env file")
 
+# Set AUDIO_ENABLED=false to never synthesize or play audio (benchmarks, servers)
+AUDIO_ENABLED = os.getenv('AUDIO_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+
 # Initialize policy retriever
 policy_retriever = PolicyRetriever()
 
+# Meeting-room bookings persist locally (BOOKINGS_DB=:memory: keeps them in memory only)
+booking_engine = BookingEngine(os.getenv('BOOKINGS_DB', 'bookings.db'), rooms=load_rooms('example_rooms.json'))
+
+# Leave, WFH, late-arrival and overtime requests with per-employee balances (REQUESTS_DB=:memory: likewise)
+request_ledger = RequestLedger(os.getenv('REQUESTS_DB', 'requests.db'))
+
+# Asset stock and reservations (an empty INVENTORY_PATH keeps them in memory only)
+inventory = Inventory(os.getenv('INVENTORY_PATH', 'inventory') or None)
+inventory.import_catalogue(load_catalogue('example_assets.json'))
+
+# Record/replay cache for completions (COMPLETION_CACHE=record|replay, off by default)
+completion_cache = CompletionCache.from_env()
+
 # System prompt for the assistant
 SYSTEM_PROMPT = """
 You are an internal office assistant that helps employees handle internal requests. Your only responsibilities include:
@@ -35,209 +61,139 @@ When responding, always:
     - When answering policy questions, provide accurate information based on the company policies and cite relevant policy details.
 """
 
-# Define tools
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "request_day_off",
-            "description": "Request a day off from work.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "date": {
-                        "type": "string",
-                        "description": "The date for the day off in YYYY-MM-DD format",
-                    },
-                    "reason": {
-                        "type": "string",
-                        "description": "Reason for the day off",
-                    },
-                },
-                "required": ["date"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "request_wfh",
-            "description": "Request to work from home.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "date": {
-                        "type": "string",
-                        "description": "The date for working from home in YYYY-MM-DD format",
-                    },
-                },
-                "required": ["date"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "request_late_coming",
-            "description": "Request permission to arrive late to work.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "date": {
-                        "type": "string",
-                        "description": "The date for late arrival in YYYY-MM-DD format",
-                    },
-                    "time": {
-                        "type": "string",
-                        "description": "The expected arrival time in HH:MM format",
-                    },
-                    "reason": {
-                        "type": "string",
-                        "description": "Reason for arriving late",
-                    },
-                },
-                "required": ["date", "time"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "request_overtime",
-            "description": "Request to work overtime.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "date": {
-                        "type": "string",
-                        "description": "The date for overtime work in YYYY-MM-DD format",
-                    },
-                    "hours": {
-                        "type": "number",
-                        "description": "Number of overtime hours requested",
-                    },
-                },
-                "required": ["date", "hours"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "request_assets",
-            "description": "Request assets or equipment for work.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "assets": {
-                        "type": "array",
-                        "items": {
-                            "type": "string",
-                            "description": "Name of an asset (e.g., laptop, monitor)",
-                        },
-                        "description": "List of assets requested",
-                    },
-                },
-                "required": ["assets"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "book_meeting_room",
-            "description": "Book a meeting room for a specific time.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "date": {
-                        "type": "string",
-                        "description": "The date for the meeting in YYYY-MM-DD format",
-                    },
-                    "start_time": {
-                        "type": "string",
-                        "description": "Start time of the meeting in HH:MM format",
-                    },
-                    "duration": {
-                        "type": "number",
-                        "description": "Duration of the meeting in hours",
-                    },
-                    "room_id": {
-                        "type": "string",
-                        "description": "Identifier for the meeting room",
-                    },
-                },
-                "required": ["date", "start_time", "duration", "room_id"],
-            },
-        },
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "query_policy",
-            "description": "Answer questions about company policies by searching the policy database.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "question": {
-                        "type": "string",
-                        "description": "The policy question to search for",
-                    },
-                },
-                "required": ["question"],
-            },
-        },
-    },
-]
-
-# Define functions
-def request_day_off(date, reason=None):
+# Define tools: each function is registered with its parameters, and the `tools`
+# schemas and argument validators are generated from these declarations
+registry = ToolRegistry()
+
+# Longest overtime request accepted for one day (0 = no limit beyond the ledger's entitlements)
+OVERTIME_MAX_HOURS = float(os.getenv('OVERTIME_MAX_HOURS', 0)) or None
+# A meeting can't run longer than the office hours rooms are bookable in
+MEETING_MAX_HOURS = (booking_engine.day_end - booking_engine.day_start) / 60
+
+def _rejection(request, date, result, unit):
+    """Explain why the request ledger refused a request"""
+    if result["reason"] == "duplicate":
+        return f"{request} for {date} was not submitted: you already have one for that date."
+    if result["reason"] == "exceeds entitlement":
+        return (f"{request} for {date} was not submitted: you have used {result['used']:g} of your "
+                f"{result['limit']:g} {unit} for {result['period']}.")
+    return f"{request} for {date} was not submitted: {result['reason']}."
+
+@registry.register(
+    "Request a day off from work.",
+    date=Param("string", "The date for the day off in YYYY-MM-DD format", format="date"),
+    reason=Param("string", "Reason for the day off", required=False),
+    leave_type=Param("string", "Type of leave (defaults to vacation)", required=False, enum=["vacation", "sick"]),
+)
+def request_day_off(date, reason=None, leave_type="vacation"):
+    kind, unit = ("sick", "sick days") if leave_type == "sick" else ("leave", "leave days")
+    result = request_ledger.submit(current_employee.get(), kind, date, 1, reason)
+    if not result["accepted"]:
+        return _rejection("Day off request", date, result, unit)
     reason_text = f" for {reason}" if reason else ""
-    return f"Day off request for {date}{reason_text} has been submitted."
+    return (f"Day off request for {date}{reason_text} has been submitted. "
+            f"You have {result['remaining']:g} of {result['limit']:g} {unit} left in {result['period']}.")
 
+@registry.register(
+    "Request to work from home.",
+    date=Param("string", "The date for working from home in YYYY-MM-DD format", format="date"),
+)
 def request_wfh(date):
-    return f"Work-from-home request for {date} has been submitted."
+    result = request_ledger.submit(current_employee.get(), "wfh", date)
+    if not result["accepted"]:
+        return _rejection("Work-from-home request", date, result, "work-from-home days")
+    return (f"Work-from-home request for {date} has been submitted. "
+            f"You have {result['remaining']:g} of {result['limit']:g} work-from-home days left in week {result['period']}.")
 
+@registry.register(
+    "Request permission to arrive late to work.",
+    date=Param("string", "The date for late arrival in YYYY-MM-DD format", format="date"),
+    time=Param("string", "The expected arrival time in HH:MM format", format="time"),
+    reason=Param("string", "Reason for arriving late", required=False),
+)
 def request_late_coming(date, time, reason=None):
+    result = request_ledger.submit(current_employee.get(), "late", date, reason=reason, arrival_time=time)
+    if not result["accepted"]:
+        return _rejection("Late arrival request", date, result, "late arrivals")
     reason_text = f" for {reason}" if reason else ""
     return f"Late arrival request for {date} at {time}{reason_text} has been submitted."
 
+@registry.register(
+    "Request to work overtime.",
+    date=Param("string", "The date for overtime work in YYYY-MM-DD format", format="date"),
+    hours=Param("number", "Number of overtime hours requested", minimum=0.5, maximum=OVERTIME_MAX_HOURS),
+)
 def request_overtime(date, hours):
-    return f"Overtime request for {hours} hours on {date} has been submitted."
+    result = request_ledger.submit(current_employee.get(), "overtime", date, hours)
+    if not result["accepted"]:
+        return _rejection("Overtime request", date, result, "overtime hours")
+    return f"Overtime request for {hours:g} hours on {date} has been submitted."
 
+@registry.register(
+    "Request assets or equipment for work.",
+    assets=Param(
+        "array", "List of assets requested", min_items=1,
+        items={"type": "string", "description": "Name of an asset (e.g., laptop, monitor)"},
+    ),
+)
 def request_assets(assets):
-    return f"Asset request for {', '.join(assets)} has been submitted."
+    items = {}
+    unknown = []
+    for name in assets:
+        item, quantity = inventory.resolve(name)
+        if item is None:
+            unknown.append(name)
+        else:
+            items[item] = items.get(item, 0) + quantity
+    if unknown:
+        return (f"Asset request for {', '.join(assets)} was not submitted: {', '.join(unknown)} "
+                f"{'is' if len(unknown) == 1 else 'are'} not in the asset catalogue. Nothing was reserved.")
+
+    result = inventory.reserve(current_employee.get(), items)
+    if not result["reserved"]:
+        shortages = "; ".join(
+            f"{item} ({shortage['available']} available, {shortage['requested']} requested)"
+            for item, shortage in result["shortages"].items()
+        )
+        return (f"Asset request for {', '.join(assets)} was not submitted: not enough stock for {shortages}. "
+                f"Nothing was reserved.")
+    return f"Asset request for {', '.join(assets)} has been submitted (reservation #{result['reservation_id']})."
 
+@registry.register(
+    "Book a meeting room for a specific time.",
+    date=Param("string", "The date for the meeting in YYYY-MM-DD format", format="date"),
+    start_time=Param("string", "Start time of the meeting in HH:MM format", format="time"),
+    duration=Param("number", "Duration of the meeting in hours", minimum=0.25, maximum=MEETING_MAX_HOURS),
+    room_id=Param("string", "Identifier for the meeting room"),
+)
 def book_meeting_room(date, start_time, duration, room_id):
-    return f"Meeting room {room_id} booked on {date} from {start_time} for {duration} hours."
+    result = booking_engine.book(room_id, date, start_time, duration, booked_by=current_employee.get())
+    if result["booked"]:
+        booking = result["booking"]
+        return (f"Meeting room {room_id} booked on {date} from {start_time} for {duration:g} hours "
+                f"(until {booking['end_time']}, booking #{booking['id']}).")
+
+    message = f"Meeting room {room_id} could not be booked on {date} from {start_time} for {duration:g} hours: {result['reason']}"
+    if result["conflicts"]:
+        message += " (" + ", ".join(f"{c['start_time']}-{c['end_time']}" for c in result["conflicts"]) + ")"
+    message += "."
+    if result["alternatives"]:
+        message += " Available alternatives: " + "; ".join(
+            f"room {slot['room_id']} from {slot['start_time']} to {slot['end_time']}" for slot in result["alternatives"]
+        ) + "."
+    else:
+        message += " No room is free for that long on this date."
+    return message
 
+@registry.register(
+    "Answer questions about company policies by searching the policy database.",
+    question=Param("string", "The policy question to search for"),
+)
 def query_policy(question):
     """Query company policies and return relevant information"""
     return policy_retriever.query_policy(question)
 
-def execute_function(function_name, arguments):
-    """Helper function to execute the appropriate function based on the tool call"""
-    try:
-        if function_name == "request_day_off":
-            return request_day_off(arguments["date"], arguments.get("reason"))
-        elif function_name == "request_wfh":
-            return request_wfh(arguments["date"])
-        elif function_name == "request_late_coming":
-            return request_late_coming(arguments["date"], arguments["time"], arguments.get("reason"))
-        elif function_name == "request_overtime":
-            return request_overtime(arguments["date"], arguments["hours"])
-        elif function_name == "request_assets":
-            return request_assets(arguments["assets"])
-        elif function_name == "book_meeting_room":
-            return book_meeting_room(arguments["date"], arguments["start_time"], arguments["duration"], arguments["room_id"])
-        elif function_name == "query_policy":
-            return query_policy(arguments["question"])
-        else:
-            return f"Unknown function: {function_name}"
-    except KeyError as e:
-        return f"Error: Missing required parameter {e}"
-    except Exception as e:
-        return f"Error executing function: {str(e)}"
+tools = registry.schemas()
 
 def detect_audio_request(user_message: str) -> bool:
     """
@@ -282,39 +238,106 @@ def detect_audio_request(user_message: str) -> bool:
     
     return False
 
-def generate_audio_response(text: str) -> str:
+def stream_completion(client, model, messages, tools, on_text=None):
     """
-    Generate audio response from text using TTS
+    Run a streamed chat completion and reassemble it into a response-shaped object
     
     Args:
-        text: Text to convert to speech
+        client: OpenAI client
+        model: Model name
+        messages: Conversation messages
+        tools: Tool schemas
+        on_text: Called with each content delta as soon as it arrives
         
     Returns:
-        Path to audio file if successful, empty string otherwise
+        Object with the same choices[0].message shape as a non-streamed response
+    """
+    content_parts = []
+    tool_calls = {}
+    usage = None
+    stream = client.chat.completions.create(
+        model=model,
+        tools=tools,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    for chunk in stream:
+        # With include_usage the last chunk carries the usage and no choices
+        if getattr(chunk, "usage", None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content_parts.append(delta.content)
+            if on_text:
+                on_text(delta.content)
+        # Tool call arguments arrive in fragments keyed by index
+        for tool_delta in delta.tool_calls or []:
+            call = tool_calls.setdefault(tool_delta.index, {"id": None, "name": "", "arguments": ""})
+            if tool_delta.id:
+                call["id"] = tool_delta.id
+            if tool_delta.function and tool_delta.function.name:
+                call["name"] += tool_delta.function.name
+            if tool_delta.function and tool_delta.function.arguments:
+                call["arguments"] += tool_delta.function.arguments
+
+    message = SimpleNamespace(
+        content="".join(content_parts) or None,
+        tool_calls=[
+            SimpleNamespace(
+                id=call["id"],
+                function=SimpleNamespace(name=call["name"], arguments=call["arguments"]),
+            )
+            for _, call in sorted(tool_calls.items())
+        ] or None,
+    )
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+def estimate_history_tokens(encoding, messages):
+    """Estimate the prompt tokens of a message list (content, tool calls and per-message overhead)"""
+    total = 0
+    for message in messages:
+        total += 4  # role and separators
+        if message.get("content"):
+            total += len(encoding.encode(message["content"]))
+        for tool_call in message.get("tool_calls") or []:
+            total += len(encoding.encode(tool_call["function"]["name"] + tool_call["function"]["arguments"]))
+    return total
+
+def process_conversation(client, model, conversation_history, user_message, tools=tools, session_id="default",
+                         on_delta=None, user_id=None, metrics=None):
+    """
+    Process a single user message and return the updated history and response
+
+    If `on_delta` is given, the completions are streamed and it is called with each text delta.
+    Requests and bookings made by the tools are recorded for `user_id` (defaults to the session id).
+    If `metrics` is a dict, this turn's metrics (e.g. time_to_first_audio in seconds) are stored in it.
     """
+    token = current_employee.set(user_id or session_id)
     try:
-        # Clean text for TTS (remove markdown formatting, etc.)
-        clean_text = text.replace('**', '').replace('*', '').replace('\n', ' ')
-        clean_text = ' '.join(clean_text.split())  # Remove extra whitespace
-        
-        # Generate audio
-        audio_path = text_to_speech(clean_text, play_audio=True)
-        
-        if audio_path:
-            print(f"🎵 Audio response generated: {audio_path}")
-            return audio_path
-        else:
-            print("⚠️  TTS generation failed, showing text only")
-            return ""
-            
-    except Exception as e:
-        print(f"⚠️  TTS error: {e}")
-        return ""
+        with span("turn", model=model):
+            return _process_conversation(client, model, conversation_history, user_message, tools, session_id,
+                                         on_delta, metrics if metrics is not None else {})
+    finally:
+        current_employee.reset(token)
+
+def _check_budget(encoding, session_id, messages, base_tokens=0):
+    """Return (estimated prompt tokens, budget error or None) for a call sending `messages` on top of `base_tokens`"""
+    history_tokens = base_tokens + estimate_history_tokens(encoding, messages)
+    return history_tokens, ledger.check_budget(session_id, history_tokens)
 
-def process_conversation(client, model, conversation_history, user_message, tools=tools):
-    """Process a single user message and return the updated history and response"""
-    encoding = tiktoken.get_encoding("cl100k_base")  # Hoặc chọn tokenizer phù hợp
-    token_count = len(encoding.encode(user_message))
+def _process_conversation(client, model, conversation_history, user_message, tools, session_id, on_delta, metrics):
+    turn_start = time.perf_counter()
+    # Both completions share the turn's deadline and go through retries, hedging and the circuit breaker
+    client = ResilientClient(client, resilient_caller, Deadline(TURN_DEADLINE))
+    if completion_cache:
+        client = completion_cache.wrap(client)
+    with span("token_count") as token_span:
+        encoding = tiktoken.get_encoding("cl100k_base")  # Hoặc chọn tokenizer phù hợp
+        token_count = len(encoding.encode(user_message))
+        token_span.set(tokens=token_count)
 
     if token_count > MAX_TOKENS:
         error_message = f"Error: Your request is too long ({token_count} tokens). Please keep it under {MAX_TOKENS} tokens."
@@ -323,23 +346,88 @@ def process_conversation(client, model, conversation_history, user_message, tool
 
     # Add user message to conversation history
     conversation_history.append({"role": "user", "content": user_message})
-    
+
+    # Enforce the session token budget before anything is sent
+    history_tokens, budget_error = _check_budget(encoding, session_id, conversation_history)
+    if budget_error:
+        conversation_history.pop()
+        return conversation_history, budget_error
+
+    # For audio requests, stream the completions and speak each sentence as soon as it is complete
+    speaker = None
+    splitter = None
+    if AUDIO_ENABLED and detect_audio_request(user_message):
+        speaker = StreamingSpeaker(start_time=turn_start)
+        splitter = SentenceSplitter()
+
+    streamed = bool(speaker or on_delta)
+
+    def on_text(delta):
+        if on_delta:
+            on_delta(delta)
+        if speaker:
+            for sentence in splitter.feed(delta):
+                speaker.feed(sentence)
+
+    try:
+        final_content = _run_completions(client, model, conversation_history, tools, session_id, encoding,
+                                         history_tokens, streamed, on_text)
+
+        # Speak the remaining text and wait for playback to finish
+        if speaker:
+            for sentence in splitter.flush():
+                speaker.feed(sentence)
+            with span("tts.drain"):
+                segments = speaker.close()
+            if segments:
+                print(f"🎵 Audio response generated: {segments} segment(s)")
+            if speaker.first_audio_latency is not None:
+                metrics["time_to_first_audio"] = speaker.first_audio_latency
+                record("tts.first_audio", speaker.first_audio_latency * 1000)
+                print(f"⏱️  Time to first audio: {speaker.first_audio_latency:.2f}s")
+    finally:
+        # Also stops the synthesis and playback threads when the turn failed
+        if speaker:
+            speaker.close()
+
+    return conversation_history, final_content
+
+def _run_completions(client, model, conversation_history, tools, session_id, encoding, history_tokens, streamed, on_text):
+    """Run the first completion, the requested tools and the follow-up completion; returns the reply text"""
     # First API call: Get model response with tools
     try:
-        response = client.chat.completions.create(
-            model=model,
-            tools=tools,
-            messages=conversation_history,
-        )
-    except openai.APIError as e:
+        with span("completion", stage="first", streamed=streamed, messages=len(conversation_history)):
+            if streamed:
+                response = stream_completion(client, model, conversation_history, tools, on_text)
+            else:
+                response = client.chat.completions.create(
+                    model=model,
+                    tools=tools,
+                    messages=conversation_history,
+                )
+    except (openai.APIError, UpstreamUnavailable, CacheMiss) as e:
         final_content = f"API error: {e}"
         # print(final_content)
-        return conversation_history, final_content
+        return final_content
+
+    called_tools = [
+        tool_call.function.name
+        for choice in response.choices
+        for tool_call in (choice.message.tool_calls or [])
+    ]
+    # A replayed response cost nothing, so it is not charged to the session's budget
+    if not getattr(client, "last_hit", False):
+        ledger.record(session_id, model, "first", response.usage, called_tools,
+                      len(conversation_history), history_tokens)
+    first_call_messages = len(conversation_history)
     
     # Process tool calls if any
     tool_calls_processed = False
     final_content = None
-    
+    # Calls rejected by argument validation; they never reach their function
+    invalid_calls = []
+    tool_results = []
+
     for choice in response.choices:
         if choice.message.tool_calls:
             tool_calls_processed = True
@@ -349,12 +437,16 @@ def process_conversation(client, model, conversation_history, user_message, tool
 
                 function_name = tool_call.function.name
                 try:
-                    arguments = json.loads(tool_call.function.arguments)
+                    arguments = json.loads(tool_call.function.arguments or "{}")
                 except json.JSONDecodeError:
                     arguments = {}
-                
-                # Execute the function
-                result = execute_function(function_name, arguments)
+
+                # Arguments are validated (repairing e.g. "9:00" or "2025/11/01") before the function runs
+                with span("execute_function", tool=function_name):
+                    result, error = registry.dispatch(function_name, arguments)
+                if error:
+                    invalid_calls.append(error)
+                tool_results.append(result)
                 
                 # Add assistant message with tool call
                 conversation_history.append({
@@ -386,15 +478,46 @@ def process_conversation(client, model, conversation_history, user_message, tool
                 "content": choice.message.content
             })
     
+    # When every tool call was invalid, ask for the missing details locally instead
+    # of spending a second completion on reporting the errors
+    if tool_calls_processed and len(invalid_calls) == len(called_tools):
+        tool_calls_processed = False
+        final_content = ("I couldn't submit that request: " + "; ".join(invalid_calls)
+                         + ". Please check the details and try again.")
+        conversation_history.append({"role": "assistant", "content": final_content})
+        if on_text:
+            on_text(final_content)
+
     # Second API call: Get final response from model
     if tool_calls_processed:
+        # Only the tool messages are new since the first call was estimated
+        history_tokens, budget_error = _check_budget(
+            encoding, session_id, conversation_history[first_call_messages:], history_tokens
+        )
+    if tool_calls_processed and budget_error:
+        # The tools have already run (requests submitted, rooms booked), so report their
+        # results directly instead of hiding them behind the budget error
+        final_content = "\n".join(tool_results) + "\n\n" + budget_error
+        conversation_history.append({"role": "assistant", "content": final_content})
+        if on_text:
+            on_text(final_content)
+    elif tool_calls_processed:
         try:
-            response = client.chat.completions.create(
-                model=model,
-                tools=tools,
-                messages=conversation_history,
-            )
+            with span("completion", stage="second", streamed=streamed, messages=len(conversation_history)):
+                if streamed:
+                    response = stream_completion(client, model, conversation_history, tools, on_text)
+                else:
+                    response = client.chat.completions.create(
+                        model=model,
+                        tools=tools,
+                        messages=conversation_history,
+                    )
             
+            # The tool round trip is charged to the tools that caused it
+            if not getattr(client, "last_hit", False):
+                ledger.record(session_id, model, "second", response.usage, called_tools,
+                              len(conversation_history), history_tokens)
+
             # Add final assistant response to history
             final_content = response.choices[0].message.content
             conversation_history.append({
@@ -404,7 +527,7 @@ def process_conversation(client, model, conversation_history, user_message, tool
             
             # print(f"AI: {final_content}")
             
-        except openai.APIError as e:
+        except (openai.APIError, UpstreamUnavailable, CacheMiss) as e:
             # print(f"API error in final response: {e}")
             final_content = f"Error: {str(e)}"
     else:
@@ -413,8 +536,4 @@ def process_conversation(client, model, conversation_history, user_message, tool
             final_content = response.choices[0].message.content
             # print(f"AI: {final_content}")
 
-    # Generate audio response if we have content and user requested audio
-    if final_content and detect_audio_request(user_message):
-        generate_audio_response(final_content)
-
-    return conversation_history, final_content
\ No newline at end of file
+    return final_content
@@ -2,6 +2,7 @@ import json
 import os
 import chromadb
 from sentence_transformers import SentenceTransformer
+from telemetry import span
 
 # Fix tokenizers parallelism warning
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
@@ -73,13 +74,16 @@ def query_policies(policies_collection, embedding_model, question, n_results=3):
     
     try:
         # Generate embedding for the question
-        query_embedding = embedding_model.encode(question).tolist()
+        with span("policy.encode", chars=len(question)):
+            query_embedding = embedding_model.encode(question).tolist()
         
         # Search in ChromaDB
-        results = policies_collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
-        )
+        with span("policy.search", n_results=n_results) as search_span:
+            results = policies_collection.query(
+                query_embeddings=[query_embedding],
+                n_results=n_results
+            )
+            search_span.set(hit=bool(results['documents'] and results['documents'][0]))
         
         if not results['documents'] or not results['documents'][0]:
             return "No relevant policies found."
@@ -0,0 +1,247 @@
+"""
+Ledger of leave, sick leave, work-from-home, late-arrival and overtime requests.
+
+Requests are stored in SQLite indexed by employee and date. Per-employee
+balances (days used per year, WFH days per week) are kept in memory and in a
+balances table, updated incrementally with every request, so checking the
+remaining entitlement never scans an employee's history.
+
+Requests are group-committed: each submitter queues its request, and whichever
+thread gets the database next checks and writes every queued request in one
+BEGIN IMMEDIATE transaction. The check and the write happen under SQLite's
+write lock, and the balance cache is dropped whenever another connection has
+committed, so processes sharing the database never over-grant an entitlement.
+"""
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from datetime import date as Date
+from typing import Dict, List, Optional, Tuple
+
+# Employee making the current request; set for the duration of a conversation turn
+current_employee: ContextVar[str] = ContextVar("current_employee", default="default")
+
+# kind -> (period, limit); kinds without an entry are recorded but not limited
+ENTITLEMENTS = {
+    "leave": ("year", 20),
+    "sick": ("year", 10),
+    "wfh": ("week", 3),
+}
+
+
+def period_of(date: str, period: str) -> str:
+    """The entitlement period a YYYY-MM-DD date falls in, e.g. "2025" or "2025-W45" """
+    day = Date.fromisoformat(date)
+    if period == "year":
+        return str(day.year)
+    if period == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    raise ValueError(f"Unknown period: {period}")
+
+
+class RequestLedger:
+    """Records employee requests and enforces entitlements in constant time"""
+
+    def __init__(self, path: str = "requests.db", entitlements: Optional[Dict[str, Tuple[str, float]]] = None):
+        """
+        Args:
+            path: SQLite database file (":memory:" for a throwaway ledger)
+            entitlements: kind -> (period, limit), defaults to ENTITLEMENTS
+        """
+        self.entitlements = ENTITLEMENTS if entitlements is None else entitlements
+        # (employee_id, kind, period) -> amount used; loaded lazily and dropped when another process commits
+        self._balances: Dict[Tuple[str, str, str], float] = {}
+        # Requests waiting for the next group commit
+        self._queue: List[Dict] = []
+        self._queue_lock = threading.Lock()
+        # All database access and the balance cache are guarded by this lock, so one connection serves every thread
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                employee_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                date TEXT NOT NULL,
+                amount REAL NOT NULL,
+                reason TEXT,
+                created_at REAL NOT NULL,
+                arrival_time TEXT
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(requests)")}
+        if "arrival_time" not in columns:
+            # Ledgers created before arrival times were recorded
+            self._conn.execute("ALTER TABLE requests ADD COLUMN arrival_time TEXT")
+        self._conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS requests_by_employee ON requests (employee_id, date, kind)"
+        )
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS balances (
+                employee_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                period TEXT NOT NULL,
+                used REAL NOT NULL,
+                PRIMARY KEY (employee_id, kind, period)
+            ) WITHOUT ROWID
+        """)
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self):
+        """Drop the balance cache if another connection committed since we last looked (caller holds the lock)"""
+        # data_version changes only for commits made by other connections
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            self._balances.clear()
+
+    def _used(self, key: Tuple[str, str, str]) -> float:
+        """Amount used for (employee_id, kind, period); caller holds the lock"""
+        used = self._balances.get(key)
+        if used is None:
+            row = self._conn.execute(
+                "SELECT used FROM balances WHERE employee_id = ? AND kind = ? AND period = ?", key
+            ).fetchone()
+            used = self._balances[key] = row[0] if row else 0.0
+        return used
+
+    def _exists(self, employee_id: str, kind: str, date: str) -> bool:
+        """Whether the employee already has a request of this kind on this date; caller holds the lock"""
+        return self._conn.execute(
+            "SELECT 1 FROM requests WHERE employee_id = ? AND date = ? AND kind = ?", (employee_id, date, kind)
+        ).fetchone() is not None
+
+    def _key(self, employee_id: str, kind: str, date: str) -> Optional[Tuple[str, str, str]]:
+        """Balance key of a request, or None if the kind is not limited"""
+        if kind not in self.entitlements:
+            return None
+        return (employee_id, kind, period_of(date, self.entitlements[kind][0]))
+
+    def balance(self, employee_id: str, kind: str, date: str) -> Optional[Dict]:
+        """
+        Entitlement balance for the period containing `date`
+
+        Returns:
+            {"period", "used", "limit", "remaining"}, or None if the kind is not limited
+        """
+        key = self._key(employee_id, kind, date)
+        if key is None:
+            return None
+        limit = self.entitlements[kind][1]
+        with self._lock:
+            self._sync()
+            used = self._used(key)
+        return {"period": key[2], "used": used, "limit": limit, "remaining": limit - used}
+
+    def submit(self, employee_id: str, kind: str, date: str, amount: float = 1, reason: Optional[str] = None,
+               arrival_time: Optional[str] = None) -> Dict:
+        """
+        Record a request if it fits the employee's remaining entitlement
+
+        Returns once the request is committed (or refused), batched with any requests submitted concurrently.
+
+        Args:
+            employee_id: Employee making the request
+            kind: "leave", "sick", "wfh", "late" or "overtime"
+            date: Date in YYYY-MM-DD format
+            amount: Days (leave, sick, wfh) or hours (overtime) requested
+            reason: Free-text reason
+            arrival_time: Expected arrival time in HH:MM format (late arrivals)
+
+        Returns:
+            {"accepted": bool, "reason": str or None} plus the balance fields for limited kinds
+        """
+        request = {"row": (employee_id, kind, date, amount, reason, time.time(), arrival_time)}
+        with self._queue_lock:
+            self._queue.append(request)
+        with self._lock:
+            # An earlier holder of the lock may already have committed this request with its own
+            if "result" not in request:
+                self._commit()
+        if "error" in request:
+            raise request["error"]
+        return request["result"]
+
+    def _commit(self):
+        """Check and write every queued request in one transaction (caller holds the lock)"""
+        with self._queue_lock:
+            batch, self._queue = self._queue, []
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync()
+                for request in batch:
+                    request["result"] = self._apply(*request["row"])
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        except BaseException as e:
+            # The batch's charges were rolled back; forget them in memory too
+            self._balances.clear()
+            for request in batch:
+                request.pop("result", None)
+                request["error"] = e
+            raise
+
+    def _apply(self, employee_id, kind, date, amount, reason, created_at, arrival_time) -> Dict:
+        """Check one request against the database and write it if accepted (caller holds the lock, in a transaction)"""
+        result = {"accepted": False, "reason": None}
+        key = self._key(employee_id, kind, date)
+        if key:
+            used = self._used(key)
+            limit = self.entitlements[kind][1]
+            result.update(period=key[2], used=used, limit=limit, remaining=limit - used)
+
+        if self._exists(employee_id, kind, date):
+            result["reason"] = "duplicate"
+            return result
+        if key and used + amount > limit:
+            result["reason"] = "exceeds entitlement"
+            return result
+
+        # A savepoint per request, so one that can't be stored leaves the rest of the batch intact
+        self._conn.execute("SAVEPOINT request")
+        try:
+            self._conn.execute(
+                "INSERT INTO requests (employee_id, kind, date, amount, reason, created_at, arrival_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (employee_id, kind, date, amount, reason, created_at, arrival_time),
+            )
+            if key:
+                self._conn.execute(
+                    "INSERT INTO balances (employee_id, kind, period, used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (employee_id, kind, period) DO UPDATE SET used = used + excluded.used",
+                    key + (amount,),
+                )
+        except (sqlite3.IntegrityError, sqlite3.InterfaceError, sqlite3.ProgrammingError, sqlite3.DataError) as e:
+            self._conn.execute("ROLLBACK TO request")
+            self._conn.execute("RELEASE request")
+            result["reason"] = f"it could not be recorded ({e})"
+            return result
+        self._conn.execute("RELEASE request")
+
+        if key:
+            self._balances[key] = used + amount
+            result.update(used=used + amount, remaining=limit - used - amount)
+        result["accepted"] = True
+        return result
+
+    def history(self, employee_id: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """An employee's requests between two dates (inclusive), oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, date, amount, reason, arrival_time FROM requests "
+                "WHERE employee_id = ? AND date >= ? AND date <= ? ORDER BY date, kind",
+                (employee_id, start or "0000-00-00", end or "9999-99-99"),
+            ).fetchall()
+        return [{"kind": kind, "date": date, "amount": amount, "reason": reason, "arrival_time": arrival_time}
+                for kind, date, amount, reason, arrival_time in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,228 @@
+"""
+Multi-user HTTP/JSON server for the office assistant
+
+    POST /chat     {"user_id": "...", "session_id": "...", "message": "...", "stream": false}
+                   Returns {"session_id": ..., "reply": ...}, or Server-Sent Events
+                   ("delta" events, then one "done" event) when "stream" is true.
+    GET  /usage    Token totals by session, model and tool (plus upstream call and completion cache statistics)
+    GET  /metrics  Timing histograms in Prometheus text format
+    GET  /health
+
+All requests share one pooled upstream client. Each user may have at most
+USER_MAX_CONCURRENCY turns in flight; sessions are stored per user.
+
+    python server.py --port 8000
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 python server.py   # against stub_server.py
+"""
+import argparse
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+# The server has no speakers; never synthesize audio for HTTP clients
+os.environ.setdefault("AUDIO_ENABLED", "false")
+
+import telemetry
+from upstream import load_config, create_client, resilient_caller
+import office_assistant
+from office_assistant import SYSTEM_PROMPT, tools, process_conversation
+from session_store import SessionStore
+from usage_ledger import ledger
+
+USER_MAX_CONCURRENCY = int(os.getenv('USER_MAX_CONCURRENCY', 2))
+# Seconds a request waits for one of its user's slots before getting 429
+USER_QUEUE_TIMEOUT = float(os.getenv('USER_QUEUE_TIMEOUT', 0.5))
+SERVER_MAX_CONCURRENCY = int(os.getenv('SERVER_MAX_CONCURRENCY', 64))
+# Seconds a request waits for a free server slot before getting 503
+SERVER_QUEUE_TIMEOUT = float(os.getenv('SERVER_QUEUE_TIMEOUT', 30))
+
+
+def session_key(user_id, session_id):
+    """Store key of a user's session; both parts are escaped so no two (user, session) pairs share a key"""
+    return f"{quote(user_id, safe='')}:{quote(session_id, safe='')}"
+
+
+class UserLimiter:
+    """Caps the number of in-flight turns per user"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        # user_id -> [semaphore, references]; kept only while a request holds or awaits a slot
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, user_id, timeout=USER_QUEUE_TIMEOUT):
+        with self._lock:
+            entry = self._semaphores.setdefault(user_id, [threading.BoundedSemaphore(self.limit), 0])
+            entry[1] += 1
+        if entry[0].acquire(timeout=timeout):
+            return True
+        self._unref(user_id)
+        return False
+
+    def release(self, user_id):
+        with self._lock:
+            semaphore = self._semaphores[user_id][0]
+        semaphore.release()
+        self._unref(user_id)
+
+    def _unref(self, user_id):
+        with self._lock:
+            entry = self._semaphores[user_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._semaphores[user_id]
+
+
+class AssistantServer:
+    """Routes chat requests to per-user sessions over one shared upstream client"""
+
+    def __init__(self, client, model, session_store, user_limit=USER_MAX_CONCURRENCY,
+                 max_concurrency=SERVER_MAX_CONCURRENCY):
+        self.client = client
+        self.model = model
+        self.session_store = session_store
+        self.user_limiter = UserLimiter(user_limit)
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+
+    def chat(self, user_id, session_id, message, on_delta=None):
+        """Run one turn for a user's session and return the reply text"""
+        # Session keys are namespaced by user so one user can't read another's history
+        key = session_key(user_id, session_id)
+        with self.session_store.session_lock(key):
+            history = self.session_store.get(key)
+            history, reply = process_conversation(
+                self.client, self.model, history, message, tools, session_id=key, on_delta=on_delta,
+                user_id=user_id,
+            )
+            self.session_store.save(key, history)
+        return reply
+
+    def make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send_json(200, {"status": "ok"})
+                elif self.path == "/usage":
+                    usage = {by: ledger.totals(by) for by in ("session", "model", "tool")}
+                    usage["upstream"] = resilient_caller.stats()
+                    if office_assistant.completion_cache:
+                        usage["completion_cache"] = office_assistant.completion_cache.stats()
+                    self._send_json(200, usage)
+                elif self.path == "/metrics":
+                    self._send_text(200, telemetry.export_prometheus(), "text/plain; version=0.0.4")
+                else:
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path != "/chat":
+                    self._send_json(404, {"error": f"Unknown path {self.path}"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except (ValueError, json.JSONDecodeError):
+                    self._send_json(400, {"error": "Request body must be JSON"})
+                    return
+
+                user_id = str(body.get("user_id") or "").strip()
+                message = str(body.get("message") or "").strip()
+                session_id = str(body.get("session_id") or "default")
+                if not user_id or not message:
+                    self._send_json(400, {"error": "user_id and message are required"})
+                    return
+
+                if not server.user_limiter.try_acquire(user_id):
+                    self._send_json(429, {"error": f"Too many concurrent requests for user {user_id}"})
+                    return
+                try:
+                    if not server.slots.acquire(timeout=SERVER_QUEUE_TIMEOUT):
+                        self._send_json(503, {"error": "Server busy, try again later"})
+                        return
+                    try:
+                        if body.get("stream"):
+                            self._chat_stream(user_id, session_id, message)
+                        else:
+                            reply = server.chat(user_id, session_id, message)
+                            self._send_json(200, {"session_id": session_id, "reply": reply})
+                    finally:
+                        server.slots.release()
+                except Exception as e:
+                    if not getattr(self, "_stream_started", False):
+                        self._send_json(500, {"error": f"Error processing request: {str(e)}"})
+                finally:
+                    server.user_limiter.release(user_id)
+
+            def _chat_stream(self, user_id, session_id, message):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self._stream_started = True
+                self.close_connection = True
+
+                def send_event(event, payload):
+                    self.wfile.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode())
+                    self.wfile.flush()
+
+                try:
+                    reply = server.chat(user_id, session_id, message,
+                                        on_delta=lambda delta: send_event("delta", {"text": delta}))
+                    send_event("done", {"session_id": session_id, "reply": reply})
+                except Exception as e:
+                    send_event("error", {"error": f"Error processing request: {str(e)}"})
+
+            def _send_json(self, status, payload):
+                self._send_text(status, json.dumps(payload, ensure_ascii=False), "application/json")
+
+            def _send_text(self, status, text, content_type):
+                data = text.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def serve(self, host, port):
+        httpd = ThreadingHTTPServer((host, port), self.make_handler())
+        httpd.daemon_threads = True
+        return httpd
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the office assistant over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--session-db", default=os.getenv('SESSION_DB', 'sessions.db'))
+    args = parser.parse_args()
+
+    model, base_url, api_key = load_config()
+    client = create_client(base_url, api_key)
+    session_store = SessionStore(args.session_db, system_prompt=SYSTEM_PROMPT)
+
+    httpd = AssistantServer(client, model, session_store).serve(args.host, args.port)
+    print(f"Office assistant listening on http://{args.host}:{args.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        session_store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Persistent conversation histories in SQLite (WAL mode) with an in-memory LRU of hot sessions
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class SessionStore:
+    """
+    Stores each session's messages as rows appended incrementally.
+
+    Hot sessions stay in memory up to `max_resident`; the least recently used
+    and those idle for `idle_seconds` are evicted and reloaded lazily on their
+    next message.
+    """
+
+    def __init__(self, path: str = "sessions.db", max_resident: int = 1000, idle_seconds: float = 1800,
+                 system_prompt: Optional[str] = None):
+        """
+        Args:
+            path: SQLite database file
+            max_resident: Maximum number of sessions kept in memory
+            idle_seconds: Sessions untouched for this long are evicted from memory
+            system_prompt: Seeded as the first message of new sessions
+        """
+        self.path = path
+        self.max_resident = max_resident
+        self.idle_seconds = idle_seconds
+        self.system_prompt = system_prompt
+        # session_id -> {"history": [...], "persisted": int, "last_access": float}
+        self._resident: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        # session_id -> [lock, references]; a lock exists only while some thread holds or awaits it
+        self._session_locks: Dict[str, List] = {}
+        self._local = threading.local()
+        self._init_db()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite connections must not be shared across threads"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID
+        """)
+
+    @contextmanager
+    def session_lock(self, session_id: str):
+        """Serialize turns of one session; hold this around get() ... save()"""
+        with self._lock:
+            lock = self._ref_lock(session_id)
+        try:
+            with lock:
+                yield
+        finally:
+            with self._lock:
+                self._unref_lock(session_id)
+
+    def _ref_lock(self, session_id: str) -> threading.RLock:
+        """Take a reference to a session's lock, creating it if needed (caller holds the lock)"""
+        slot = self._session_locks.get(session_id)
+        if slot is None:
+            # Reentrant: get() and save() take it again inside a caller's session_lock()
+            slot = self._session_locks[session_id] = [threading.RLock(), 0]
+        slot[1] += 1
+        return slot[0]
+
+    def _unref_lock(self, session_id: str):
+        """Drop a reference; the last one removes the lock (caller holds the lock)"""
+        slot = self._session_locks[session_id]
+        slot[1] -= 1
+        if slot[1] == 0:
+            del self._session_locks[session_id]
+
+    def get(self, session_id: str) -> List[Dict]:
+        """
+        Return the session's history, loading it from disk if it is not resident
+
+        Args:
+            session_id: Session identifier
+
+        Returns:
+            The history list; mutate it and pass it to save()
+        """
+        with self._lock:
+            entry = self._resident.get(session_id)
+            if entry is not None:
+                self._resident.move_to_end(session_id)
+                entry["last_access"] = time.monotonic()
+                return entry["history"]
+
+        # Loading under the session's lock waits for an eviction of this session to finish
+        # flushing, so the rows read here are never stale
+        with self.session_lock(session_id):
+            with self._lock:
+                entry = self._resident.get(session_id)
+            if entry is None:
+                rows = self._connection().execute(
+                    "SELECT message FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+                ).fetchall()
+                history = [json.loads(row[0]) for row in rows]
+                persisted = len(history)
+                if not history and self.system_prompt:
+                    history = [{"role": "system", "content": self.system_prompt}]
+                entry = {"history": history, "persisted": persisted, "last_access": time.monotonic()}
+
+            with self._lock:
+                # Another thread may have loaded it meanwhile; keep the first copy
+                entry = self._resident.setdefault(session_id, entry)
+                self._resident.move_to_end(session_id)
+                evicted = self._pop_evictable(keep=session_id)
+        self._flush_evicted(evicted)
+        return entry["history"]
+
+    def save(self, session_id: str, history: List[Dict]):
+        """
+        Persist messages appended since the last save
+
+        Args:
+            session_id: Session identifier
+            history: The session's full history
+        """
+        with self.session_lock(session_id):
+            with self._lock:
+                entry = self._resident.get(session_id)
+                if entry is None or entry["history"] is not history:
+                    entry = {"history": history, "persisted": self._persisted_count(session_id),
+                             "last_access": time.monotonic()}
+                    self._resident[session_id] = entry
+                entry["last_access"] = time.monotonic()
+                self._resident.move_to_end(session_id)
+            self._flush_entries([(session_id, entry)])
+
+    def _persisted_count(self, session_id: str) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM messages WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0]
+
+    def _flush_entries(self, entries):
+        conn = self._connection()
+        for session_id, entry in entries:
+            history = entry["history"]
+            persisted = entry["persisted"]
+            if len(history) == persisted:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if len(history) < persisted:
+                    # History was truncated in memory; rewrite it
+                    conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                    persisted = 0
+                # Append after the last stored row, even if another process wrote it; a plain INSERT
+                # makes any clash raise instead of overwriting someone else's messages
+                next_seq = conn.execute(
+                    "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                conn.executemany(
+                    "INSERT INTO messages (session_id, seq, message) VALUES (?, ?, ?)",
+                    [(session_id, seq, json.dumps(message, ensure_ascii=False))
+                     for seq, message in enumerate(history[persisted:], next_seq)],
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            entry["persisted"] = len(history)
+
+    def _pop_evictable(self, keep: Optional[str] = None):
+        """
+        Remove LRU and idle sessions from memory and return them for flushing (caller holds the lock)
+
+        Sessions whose lock is held or awaited stay resident. Each evicted session's
+        lock is taken here and held until _flush_evicted() has written it out.
+        """
+        evicted = []
+        now = time.monotonic()
+        for session_id, entry in list(self._resident.items()):
+            over_capacity = len(self._resident) > self.max_resident
+            idle = now - entry["last_access"] > self.idle_seconds
+            if not (over_capacity or idle):
+                break
+            if session_id == keep or session_id in self._session_locks:
+                continue
+            del self._resident[session_id]
+            # Nobody references this lock, so it is free
+            self._ref_lock(session_id).acquire()
+            evicted.append((session_id, entry))
+        return evicted
+
+    def _flush_evicted(self, evicted):
+        """Write out sessions returned by _pop_evictable() and release their locks"""
+        try:
+            self._flush_entries(evicted)
+        finally:
+            with self._lock:
+                for session_id, _ in evicted:
+                    self._session_locks[session_id][0].release()
+                    self._unref_lock(session_id)
+
+    def evict_idle(self) -> int:
+        """Evict idle sessions now; returns how many were evicted"""
+        with self._lock:
+            evicted = self._pop_evictable()
+        self._flush_evicted(evicted)
+        return len(evicted)
+
+    def resident_count(self) -> int:
+        with self._lock:
+            return len(self._resident)
+
+    def delete(self, session_id: str):
+        """Forget a session in memory and on disk"""
+        with self.session_lock(session_id):
+            with self._lock:
+                self._resident.pop(session_id, None)
+            self._connection().execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+
+    def close(self):
+        """Flush every resident session and close this thread's connection"""
+        with self._lock:
+            entries = list(self._resident.items())
+        self._flush_entries(entries)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,268 @@
+"""
+Local OpenAI-compatible chat-completions stub for offline tests, benchmarks and load tests
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Scripted tool calls: the first rule whose pattern matches the last user message triggers its tool.
+# Argument values are formatted with the pattern's named groups (plus {message}); values that parse
+# as JSON (numbers, lists) are sent as JSON, everything else as a string.
+DEFAULT_RULES = [
+    {
+        "pattern": r"(?:day off|leave).*?(?P<date>\d{4}-\d{2}-\d{2})(?:.*?for (?P<reason>[^.?!]+))?",
+        "tool": "request_day_off",
+        "arguments": {"date": "{date}", "reason": "{reason}"},
+    },
+    {
+        "pattern": r"(?:work from home|wfh|remote).*?(?P<date>\d{4}-\d{2}-\d{2})",
+        "tool": "request_wfh",
+        "arguments": {"date": "{date}"},
+    },
+    {
+        "pattern": r"late.*?(?P<date>\d{4}-\d{2}-\d{2}) at (?P<time>\d{1,2}:\d{2})(?:.*?due to (?P<reason>[^.?!]+))?",
+        "tool": "request_late_coming",
+        "arguments": {"date": "{date}", "time": "{time}", "reason": "{reason}"},
+    },
+    {
+        "pattern": r"(?P<hours>\d+(?:\.\d+)?) hours? overtime on (?P<date>\d{4}-\d{2}-\d{2})",
+        "tool": "request_overtime",
+        "arguments": {"date": "{date}", "hours": "{hours}"},
+    },
+    {
+        "pattern": r"(?:need|request).*?(?:laptop|monitor|keyboard|mouse|headset)",
+        "tool": "request_assets",
+        "arguments": {"assets": "[\"laptop\", \"monitor\"]"},
+    },
+    {
+        "pattern": r"meeting room on (?P<date>\d{4}-\d{2}-\d{2}) from (?P<start_time>\d{1,2}:\d{2}) for (?P<duration>\d+(?:\.\d+)?) hours? in room (?P<room_id>\w+)",
+        "tool": "book_meeting_room",
+        "arguments": {"date": "{date}", "start_time": "{start_time}", "duration": "{duration}", "room_id": "{room_id}"},
+    },
+    {
+        "pattern": r"polic|leave|sick|remote|overtime|dress code|reimburs|expense",
+        "tool": "query_policy",
+        "arguments": {"question": "{message}"},
+    },
+]
+
+DEFAULT_REPLY = "I can help with leave, remote work, late arrival, overtime, equipment, meeting rooms and policy questions."
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class StubOpenAIServer:
+    """Threaded HTTP server answering /chat/completions with scripted replies after a configurable delay"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 token_latency: float = 0.0, rules: Optional[List[Dict]] = None, failure_rate: float = 0.0):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds to wait before answering each request
+            jitter: Extra random delay of up to this many seconds
+            token_latency: Seconds between streamed chunks
+            rules: Scripted tool-call rules (defaults to DEFAULT_RULES)
+            failure_rate: Fraction of requests answered with HTTP 500
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.token_latency = token_latency
+        self.failure_rate = failure_rate
+        self.rules = [dict(rule, regex=re.compile(rule["pattern"], re.IGNORECASE)) for rule in (rules or DEFAULT_RULES)]
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reply_for(self, messages: List[Dict]) -> Dict:
+        """Return {"content": ...} or {"tool_call": {...}} for a conversation"""
+        last = messages[-1] if messages else {}
+        if last.get("role") == "tool":
+            try:
+                result = json.loads(last.get("content") or "{}").get("result", "")
+            except (json.JSONDecodeError, AttributeError):
+                result = last.get("content", "")
+            return {"content": f"Done. {result}"}
+
+        user_message = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        for rule in self.rules:
+            match = rule["regex"].search(user_message)
+            if not match:
+                continue
+            groups = {k: (v or "").strip() for k, v in match.groupdict().items()}
+            groups["message"] = user_message
+            arguments = {}
+            for key, template in rule["arguments"].items():
+                value = template.format(**groups)
+                if value == "":
+                    continue
+                try:
+                    arguments[key] = json.loads(value)
+                except json.JSONDecodeError:
+                    arguments[key] = value
+            return {"tool_call": {"id": f"call_{uuid.uuid4().hex[:12]}", "name": rule["tool"],
+                                  "arguments": json.dumps(arguments)}}
+        return {"content": DEFAULT_REPLY}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Small header/body writes would otherwise stall on Nagle + delayed ACK (~40ms)
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with stub._count_lock:
+                    stub.request_count += 1
+
+                time.sleep(stub.latency + random.uniform(0, stub.jitter))
+                if stub.failure_rate and random.random() < stub.failure_rate:
+                    self._send_json(500, {"error": {"message": "Stub upstream failure", "type": "server_error"}})
+                    return
+
+                messages = body.get("messages", [])
+                reply = stub.reply_for(messages)
+                usage = {
+                    "prompt_tokens": sum(_estimate_tokens(json.dumps(m)) for m in messages),
+                    "completion_tokens": _estimate_tokens(reply.get("content") or json.dumps(reply.get("tool_call"))),
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+                if body.get("stream"):
+                    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+                    self._send_stream(body.get("model", "stub"), reply, usage if include_usage else None)
+                else:
+                    self._send_json(200, self._completion(body.get("model", "stub"), reply, usage))
+
+            def _completion(self, model, reply, usage):
+                message = {"role": "assistant", "content": reply.get("content")}
+                finish_reason = "stop"
+                if "tool_call" in reply:
+                    call = reply["tool_call"]
+                    message["tool_calls"] = [{"id": call["id"], "type": "function",
+                                              "function": {"name": call["name"], "arguments": call["arguments"]}}]
+                    finish_reason = "tool_calls"
+                return {
+                    "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                    "usage": usage,
+                }
+
+            def _send_stream(self, model, reply, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+                def chunk(delta, finish_reason=None, chunk_usage=None):
+                    payload = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if delta is not None else [],
+                    }
+                    if chunk_usage:
+                        payload["usage"] = chunk_usage
+                    self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+                    self.wfile.flush()
+
+                if "tool_call" in reply:
+                    call = reply["tool_call"]
+                    chunk({"role": "assistant", "tool_calls": [{"index": 0, "id": call["id"], "type": "function",
+                                                                "function": {"name": call["name"], "arguments": call["arguments"]}}]})
+                    chunk({}, "tool_calls")
+                else:
+                    for word in re.findall(r"\S+\s*", reply["content"]):
+                        chunk({"content": word})
+                        time.sleep(stub.token_latency)
+                    chunk({}, "stop")
+                if usage:
+                    chunk(None, chunk_usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+            def _send_json(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible chat-completions stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random delay up to this many seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed chunks")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    parser.add_argument("--rules", help="JSON file with scripted tool-call rules")
+    args = parser.parse_args()
+
+    rules = None
+    if args.rules:
+        with open(args.rules, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+
+    server = StubOpenAIServer(args.host, args.port, args.latency, args.jitter, args.token_latency, rules, args.failure_rate)
+    print(f"Stub upstream listening on {server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
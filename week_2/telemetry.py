@@ -0,0 +1,189 @@
+"""
+Lightweight timing spans with histogram aggregation and JSON-lines / Prometheus export
+
+Enable with TELEMETRY_ENABLED=true (or telemetry.enable()). While disabled,
+span() returns a shared no-op object, so instrumented code pays only a
+function call and a flag check.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+# Span attributes that become histogram labels; everything else is only kept on the span record
+LABEL_KEYS = ("stage", "tool", "hit", "model")
+
+_enabled = os.getenv('TELEMETRY_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+_lock = threading.Lock()
+_histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], "Histogram"] = {}
+_spans = deque(maxlen=int(os.getenv('TELEMETRY_MAX_SPANS', 10000)))
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+
+
+class Span:
+    """Times a block of code and records it on exit"""
+
+    __slots__ = ("name", "attributes", "start")
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+
+    def set(self, **attributes):
+        """Add attributes known only once the work is done (e.g. hit/miss)"""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self.start) * 1000
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        record(self.name, duration_ms, self.attributes)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes):
+    """
+    Context manager timing one stage
+
+    Args:
+        name: Stage name, e.g. "completion" or "policy.search"
+        **attributes: Details such as tokens, tool name or hit/miss
+
+    Returns:
+        A span (or a no-op when telemetry is disabled) supporting set(**attributes)
+    """
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def record(name: str, duration_ms: float, attributes: Optional[Dict] = None):
+    """Record a duration measured elsewhere (e.g. time to first audio)"""
+    if not _enabled:
+        return
+    attributes = attributes or {}
+    labels = tuple((key, str(attributes[key])) for key in LABEL_KEYS if key in attributes)
+    with _lock:
+        histogram = _histograms.get((name, labels))
+        if histogram is None:
+            histogram = _histograms[(name, labels)] = Histogram()
+        histogram.observe(duration_ms)
+        _spans.append({"name": name, "ts": time.time(), "duration_ms": duration_ms, **attributes})
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Drop all recorded spans and histograms"""
+    with _lock:
+        _histograms.clear()
+        _spans.clear()
+
+
+def export_jsonl(path: Optional[str] = None) -> str:
+    """
+    Export recorded spans as JSON lines
+
+    Args:
+        path: File to append the lines to (optional)
+
+    Returns:
+        The exported JSON-lines text
+    """
+    with _lock:
+        text = "".join(json.dumps(s, default=str) + "\n" for s in _spans)
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+    return text
+
+
+def summary() -> Dict[str, Dict]:
+    """Count, total and mean duration per span name and label set"""
+    with _lock:
+        result = {}
+        for (name, labels), histogram in _histograms.items():
+            key = name + "".join(f"[{k}={v}]" for k, v in labels)
+            result[key] = {
+                "count": histogram.count,
+                "sum_ms": histogram.sum_ms,
+                "mean_ms": histogram.sum_ms / histogram.count if histogram.count else 0.0,
+            }
+        return result
+
+
+def export_prometheus() -> str:
+    """Render the histograms in Prometheus text exposition format (durations in seconds)"""
+    lines = []
+    with _lock:
+        by_name: Dict[str, list] = {}
+        for (name, labels), histogram in sorted(_histograms.items()):
+            by_name.setdefault(name, []).append((labels, histogram))
+
+        for name, series in by_name.items():
+            metric = "office_assistant_" + name.replace(".", "_").replace("-", "_") + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, histogram in series:
+                base = ",".join(f'{k}="{v}"' for k, v in labels)
+                cumulative = 0
+                for bound, count in zip(BUCKETS_MS + (None,), histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound is None else repr(bound / 1000)
+                    label_text = f'{base},le="{le}"' if base else f'le="{le}"'
+                    lines.append(f"{metric}_bucket{{{label_text}}} {cumulative}")
+                suffix = f"{{{base}}}" if base else ""
+                lines.append(f"{metric}_sum{suffix} {histogram.sum_ms / 1000}")
+                lines.append(f"{metric}_count{suffix} {histogram.count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import unittest
+from booking_engine import BookingEngine
+
+
+class TestBookingEngine(unittest.TestCase):
+    def setUp(self):
+        rooms = {room_id: {"id": room_id} for room_id in ("A1", "A2", "A3")}
+        self.engine = BookingEngine(":memory:", rooms=rooms)
+
+    def tearDown(self):
+        self.engine.close()
+
+    def test_overlapping_booking_is_rejected_with_conflicts_and_alternatives(self):
+        self.assertTrue(self.engine.book("A1", "2025-11-05", "14:00", 2)["booked"])
+        # Touching intervals do not conflict
+        self.assertTrue(self.engine.book("A1", "2025-11-05", "16:00", 1)["booked"])
+
+        result = self.engine.book("A1", "2025-11-05", "15:00", 1)
+        self.assertFalse(result["booked"])
+        self.assertEqual([(c["start_time"], c["end_time"]) for c in result["conflicts"]], [("14:00", "16:00")])
+        # The same room at the nearest free time comes first, then other rooms at the requested time
+        self.assertEqual(result["alternatives"][0], {"room_id": "A1", "start_time": "13:00", "end_time": "14:00"})
+        self.assertIn({"room_id": "A2", "start_time": "15:00", "end_time": "16:00"}, result["alternatives"])
+
+    def test_office_hours_and_unknown_rooms(self):
+        result = self.engine.book("A1", "2025-11-05", "17:30", 1)
+        self.assertFalse(result["booked"])
+        self.assertIn("office hours", result["reason"])
+        self.assertEqual(result["alternatives"][0], {"room_id": "A1", "start_time": "17:00", "end_time": "18:00"})
+
+        result = self.engine.book("Z9", "2025-11-05", "10:00", 1)
+        self.assertFalse(result["booked"])
+        self.assertIn("does not exist", result["reason"])
+
+    def test_free_slots_and_cancel(self):
+        booking = self.engine.book("A1", "2025-11-05", "08:00", 10)["booking"]
+        slots = self.engine.free_slots("2025-11-05", 60, preferred_start=9 * 60)
+        self.assertNotIn("A1", [slot["room_id"] for slot in slots])
+
+        self.assertTrue(self.engine.cancel(booking["id"]))
+        self.assertFalse(self.engine.cancel(booking["id"]))
+        self.assertTrue(self.engine.book("A1", "2025-11-05", "09:00", 1)["booked"])
+
+    def test_concurrent_bookings_of_one_slot_succeed_once(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.engine.book("A2", "2025-11-06", "10:00", 1)["booked"]))
+            for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(len(self.engine.bookings("2025-11-06", "A2")), 1)
+
+    def test_bookings_persist(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "bookings.db")
+            engine = BookingEngine(path)
+            engine.book("A1", "2025-11-05", "10:00", 1.5)
+            engine.close()
+            reopened = BookingEngine(path)
+            self.assertEqual(reopened.conflicts("A1", "2025-11-05", 11 * 60, 12 * 60)[0]["end_time"], "11:30")
+            reopened.close()
+
+    def test_engines_sharing_a_database_never_double_book(self):
+        # Two engines on one file stand in for the CLI and the server running side by side
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "bookings.db")
+            cli, server = BookingEngine(path), BookingEngine(path)
+            self.assertEqual(server.bookings("2025-11-07"), [])  # caches the empty date
+
+            self.assertTrue(cli.book("B1", "2025-11-07", "10:00", 1)["booked"])
+            result = server.book("B1", "2025-11-07", "10:30", 1)
+            self.assertFalse(result["booked"])
+            self.assertEqual(result["conflicts"][0]["start_time"], "10:00")
+
+            # Cancellations made elsewhere are seen too
+            self.assertTrue(cli.cancel(result["conflicts"][0]["id"]))
+            self.assertTrue(server.book("B1", "2025-11-07", "10:30", 1)["booked"])
+            self.assertFalse(cli.book("B1", "2025-11-07", "11:00", 1)["booked"])
+            cli.close()
+            server.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
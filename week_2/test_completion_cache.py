@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+import openai
+from shared.completion_cache import CompletionCache, CacheMiss, request_key
+from stub_server import StubOpenAIServer
+
+
+class TestCompletionCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = StubOpenAIServer().start()
+        cls.client = openai.OpenAI(base_url=cls.stub.base_url, api_key="stub", max_retries=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def request(self, text, **kwargs):
+        return dict(model="stub-model", messages=[{"role": "user", "content": text}], **kwargs)
+
+    def test_key_is_canonical(self):
+        self.assertEqual(request_key({"model": "m", "messages": [{"role": "user", "content": "hi"}]}),
+                         request_key({"messages": [{"content": "hi", "role": "user"}], "model": "m"}))
+        self.assertNotEqual(request_key({"model": "m"}), request_key({"model": "n"}))
+
+    def test_record_then_strict_replay(self):
+        cache = CompletionCache(self.path, "record")
+        recorded = cache.wrap(self.client).chat.completions.create(**self.request("hello"))
+        cache.close()
+
+        before = self.stub.request_count
+        replay = CompletionCache(self.path, "replay")
+        client = replay.wrap(self.client)
+        replayed = client.chat.completions.create(**self.request("hello"))
+        self.assertTrue(client.last_hit)
+        self.assertEqual(replayed.choices[0].message.content, recorded.choices[0].message.content)
+        self.assertEqual(replayed.usage.total_tokens, recorded.usage.total_tokens)
+        with self.assertRaises(CacheMiss):
+            client.chat.completions.create(**self.request("never recorded"))
+        self.assertFalse(client.last_hit)
+        self.assertEqual(self.stub.request_count, before)
+        stats = replay.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+        replay.close()
+
+    def test_streams_are_recorded_and_replayed(self):
+        kwargs = self.request("stream me", stream=True, stream_options={"include_usage": True})
+        cache = CompletionCache(self.path, "record")
+        client = cache.wrap(self.client)
+        recorded = [chunk.choices[0].delta.content for chunk in client.chat.completions.create(**kwargs)
+                    if chunk.choices]
+        replayed = [chunk.choices[0].delta.content for chunk in client.chat.completions.create(**kwargs)
+                    if chunk.choices]
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(cache.stats()["hits"], 1)
+        cache.close()
+
+    def test_size_bound_evicts_least_recently_used(self):
+        cache = CompletionCache(self.path, "record")
+        cache.put("a", "completion", {"x": 1})
+        cache.put("b", "completion", {"x": 2})
+        entry_size = cache.stats()["bytes"] // 2
+        cache.close()
+
+        # Room for exactly one entry: storing another evicts the older one, never the new one
+        cache = CompletionCache(self.path, "record", max_bytes=entry_size)
+        cache.put("c", "completion", {"x": 3})
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.get("c"), ("completion", {"x": 3}))
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+
+        # An entry larger than the whole budget is still kept until the next one replaces it
+        cache.max_bytes = 1
+        cache.put("d", "completion", {"x": 4})
+        self.assertEqual(cache.get("d"), ("completion", {"x": 4}))
+        self.assertEqual(cache.stats()["evictions"], 3)
+        cache.close()
+
+if __name__ == "__main__":
+    unittest.main()
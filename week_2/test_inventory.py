@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+import unittest
+from inventory import Inventory
+
+CATALOGUE = [
+    {"id": "laptop", "name": "Laptop", "aliases": ["notebook"], "stock": 2},
+    {"id": "monitor", "name": "Monitor", "aliases": ["screen"], "stock": 5},
+]
+
+
+class TestInventory(unittest.TestCase):
+    def setUp(self):
+        self.inventory = Inventory(None)
+        self.inventory.import_catalogue(CATALOGUE)
+
+    def test_resolve_names(self):
+        self.assertEqual(self.inventory.resolve("a Laptop"), ("laptop", 1))
+        self.assertEqual(self.inventory.resolve("2 monitors"), ("monitor", 2))
+        self.assertEqual(self.inventory.resolve("screens"), ("monitor", 1))
+        self.assertEqual(self.inventory.resolve("stapler"), (None, 1))
+
+    def test_reservation_is_all_or_nothing(self):
+        result = self.inventory.reserve("alice", {"laptop": 3, "monitor": 1})
+        self.assertFalse(result["reserved"])
+        self.assertEqual(result["shortages"], {"laptop": {"requested": 3, "available": 2}})
+        self.assertEqual(self.inventory.available("monitor"), 5)
+
+        result = self.inventory.reserve("alice", {"laptop": 2, "monitor": 1})
+        self.assertTrue(result["reserved"])
+        self.assertEqual((self.inventory.available("laptop"), self.inventory.available("monitor")), (0, 4))
+
+        self.assertTrue(self.inventory.release(result["reservation_id"]))
+        self.assertFalse(self.inventory.release(result["reservation_id"]))
+        self.assertEqual(self.inventory.available("laptop"), 2)
+
+    def test_concurrent_reservations_never_oversell(self):
+        self.inventory.restock({"monitor": 95})
+        results = []
+
+        def worker():
+            for _ in range(20):
+                results.append(self.inventory.reserve("bob", {"monitor": 1})["reserved"])
+
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 100)
+        self.assertEqual(self.inventory.available("monitor"), 0)
+
+    def test_journal_and_snapshot_recovery(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "inventory")
+            inventory = Inventory(path, compact_every=3)
+            inventory.import_catalogue(CATALOGUE)
+            first = inventory.reserve("alice", {"laptop": 1})["reservation_id"]
+            inventory.reserve("bob", {"monitor": 2})  # third entry: compacts into the snapshot
+            inventory.reserve("carol", {"monitor": 1})
+            inventory.release(first)
+            inventory.close()
+            self.assertTrue(os.path.exists(path + ".snapshot.json"))
+
+            reopened = Inventory(path)
+            # Restarting does not restock the catalogue again
+            reopened.import_catalogue(CATALOGUE)
+            self.assertEqual((reopened.available("laptop"), reopened.available("monitor")), (2, 2))
+            self.assertEqual(sorted(r["employee"] for r in reopened.reservations().values()), ["bob", "carol"])
+            reopened.close()
+
+    def test_new_catalogue_items_are_stocked_on_restart(self):
+        self.inventory.reserve("alice", {"laptop": 1})
+        self.inventory.import_catalogue(CATALOGUE + [{"id": "headset", "name": "Headset", "stock": 4}])
+        # Items already stocked keep their counts; only the new one is added
+        self.assertEqual([self.inventory.available(item) for item in ("laptop", "monitor", "headset")], [1, 5, 4])
+
+    def test_processes_sharing_the_files_never_oversell(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "inventory")
+            first = Inventory(path, compact_every=4)
+            first.import_catalogue(CATALOGUE)
+            second = Inventory(path, compact_every=4)
+            second.import_catalogue(CATALOGUE)
+            # Each sees the other's reservations even across compactions, and ids never collide
+            ids = []
+            for inventory in (first, second) * 4:
+                result = inventory.reserve("alice", {"monitor": 1})
+                if result["reserved"]:
+                    ids.append(result["reservation_id"])
+            self.assertEqual(len(ids), 5)
+            self.assertEqual(len(set(ids)), 5)
+            self.assertEqual(second.reserve("bob", {"monitor": 1})["shortages"]["monitor"]["available"], 0)
+            self.assertTrue(first.release(ids[1]))
+            self.assertFalse(second.release(ids[1]))
+            self.assertTrue(second.reserve("bob", {"monitor": 1})["reserved"])
+            first.close()
+            second.close()
+
+            reopened = Inventory(path)
+            self.assertEqual((reopened.available("laptop"), reopened.available("monitor")), (2, 0))
+            self.assertEqual(len(reopened.reservations()), 5)
+            reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
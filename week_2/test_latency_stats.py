@@ -0,0 +1,24 @@
+import unittest
+from latency_stats import percentile, summarize
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_percentile_picks_the_nearest_rank(self):
+        values = [i / 100 for i in range(100, 0, -1)]
+        self.assertEqual(percentile(values, 50), 0.51)
+        self.assertEqual(percentile(values, 99), 0.99)
+        self.assertEqual(percentile(values, 100), 1.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_summarize_reports_milliseconds(self):
+        summary = summarize([0.001, 0.002, 0.003, 0.010])
+        self.assertEqual(summary["count"], 4)
+        self.assertAlmostEqual(summary["mean_ms"], 4.0)
+        self.assertAlmostEqual(summary["p50_ms"], 3.0)
+        self.assertAlmostEqual(summary["p99_ms"], 10.0)
+        self.assertAlmostEqual(summary["max_ms"], 10.0)
+        self.assertEqual(summarize([])["p99_ms"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
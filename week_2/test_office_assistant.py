@@ -2,10 +2,18 @@ import os
 import json
 from pathlib import Path
 import unittest
-from unittest.mock import patch, Mock
 from dotenv import load_dotenv
 import openai
+
+# Keep the test run silent and offline
+os.environ.setdefault("AUDIO_ENABLED", "false")
+# Replayed conversations must not see bookings, requests or reservations from earlier runs
+os.environ.setdefault("BOOKINGS_DB", ":memory:")
+os.environ.setdefault("REQUESTS_DB", ":memory:")
+os.environ.setdefault("INVENTORY_PATH", "")
+
 from office_assistant import SYSTEM_PROMPT, tools, process_conversation
+from stub_server import StubOpenAIServer
 
 # Load environment variables
 load_dotenv()
@@ -30,21 +38,13 @@ When responding, always:
 class TestOfficeAssistant(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        # Read configuration from environment variables
-        cls.model = os.getenv('MODEL')
-        cls.base_url = os.getenv('OPENAI_BASE_URL')
-        cls.api_key = os.getenv('OPENAI_API_KEY')
-        
-        if not cls.model:
-            raise ValueError("MODEL is not set in .env file")
-        if not cls.base_url:
-            raise ValueError("OPENAI_BASE_URL is not set in .env file")
-        if not cls.api_key:
-            raise ValueError("OPENAI_API_KEY is not set in .env file")
-        
+        # Serve completions from a local stub so the test never reaches the real upstream
+        cls.stub = StubOpenAIServer().start()
+        cls.model = "stub-model"
         cls.client = openai.OpenAI(
-            base_url=cls.base_url,
-            api_key=cls.api_key
+            base_url=cls.stub.base_url,
+            api_key="stub",
+            max_retries=0
         )
         
         # System prompt
@@ -57,6 +57,10 @@ class TestOfficeAssistant(unittest.TestCase):
         # Create responses directory
         Path(cls.responses_dir).mkdir(exist_ok=True)
 
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.stop()
+
     def read_conversation_inputs(self, file_path):
         """Helper method to read conversation inputs from a file."""
         try:
@@ -91,29 +95,24 @@ class TestOfficeAssistant(unittest.TestCase):
                         }
                     ]
                     
-                    # Mock process_conversation to avoid actual API calls
-                    with patch('office_assistant.process_conversation') as mock_process:
-                        mock_process.return_value = (conversation_history, f"Mock response for {filename}")
-                        
-                        conversation_output = {}
-                        for i, user_message in enumerate(conversation_inputs, 1):
-                            # Simulate processing
-                            updated_history, final_content = process_conversation(
-                                self.client, self.model, conversation_history, user_message, tools
-                            )
-                            conversation_output[f"turn_{i}"] = {
-                                "user": user_message,
-                                "ai": final_content or "No response generated"
-                            }
-                            conversation_history = updated_history
-                        
-                        # Save output to JSON
-                        try:
-                            with open(output_path, "w", encoding="utf-8") as f:
-                                json.dump(conversation_output, f, indent=2, ensure_ascii=False)
-                            self.assertTrue(os.path.exists(output_path), f"Output file {output_path} was not created")
-                        except Exception as e:
-                            self.fail(f"Error saving conversation to JSON: {str(e)}")
+                    conversation_output = {}
+                    for i, user_message in enumerate(conversation_inputs, 1):
+                        updated_history, final_content = process_conversation(
+                            self.client, self.model, conversation_history, user_message, tools
+                        )
+                        conversation_output[f"turn_{i}"] = {
+                            "user": user_message,
+                            "ai": final_content or "No response generated"
+                        }
+                        conversation_history = updated_history
+                    
+                    # Save output to JSON
+                    try:
+                        with open(output_path, "w", encoding="utf-8") as f:
+                            json.dump(conversation_output, f, indent=2, ensure_ascii=False)
+                        self.assertTrue(os.path.exists(output_path), f"Output file {output_path} was not created")
+                    except Exception as e:
+                        self.fail(f"Error saving conversation to JSON: {str(e)}")
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import os
+import tempfile
+import threading
+import unittest
+from request_ledger import RequestLedger, period_of
+
+
+class TestRequestLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "requests.db")
+        self.ledger = RequestLedger(self.path)
+
+    def tearDown(self):
+        self.ledger.close()
+        self.tmpdir.cleanup()
+
+    def test_periods(self):
+        self.assertEqual(period_of("2025-11-05", "year"), "2025")
+        self.assertEqual(period_of("2025-11-05", "week"), "2025-W45")
+        # ISO weeks can belong to the next year
+        self.assertEqual(period_of("2024-12-30", "week"), "2025-W01")
+
+    def test_wfh_limit_per_week_and_duplicates(self):
+        for day in ("2025-11-03", "2025-11-04", "2025-11-05"):
+            self.assertTrue(self.ledger.submit("alice", "wfh", day)["accepted"])
+        result = self.ledger.submit("alice", "wfh", "2025-11-06")
+        self.assertFalse(result["accepted"])
+        self.assertEqual(result["reason"], "exceeds entitlement")
+        self.assertEqual(result["remaining"], 0)
+
+        # A new week and another employee have their own balances
+        self.assertTrue(self.ledger.submit("alice", "wfh", "2025-11-10")["accepted"])
+        self.assertTrue(self.ledger.submit("bob", "wfh", "2025-11-06")["accepted"])
+        self.assertEqual(self.ledger.submit("bob", "wfh", "2025-11-06")["reason"], "duplicate")
+
+    def test_leave_balance_and_unlimited_kinds(self):
+        result = self.ledger.submit("alice", "leave", "2025-11-03", reason="family event")
+        self.assertEqual((result["used"], result["limit"], result["remaining"]), (1, 20, 19))
+        self.assertEqual(self.ledger.balance("alice", "sick", "2025-11-03")["remaining"], 10)
+        self.assertIsNone(self.ledger.balance("alice", "overtime", "2025-11-03"))
+        self.assertTrue(self.ledger.submit("alice", "overtime", "2025-11-04", 3)["accepted"])
+
+    def test_balances_and_history_survive_restart(self):
+        for day in range(1, 11):
+            self.ledger.submit("alice", "sick", f"2025-03-{day:02d}")
+        self.ledger.close()
+
+        self.ledger = RequestLedger(self.path)
+        self.assertEqual(self.ledger.balance("alice", "sick", "2025-12-31")["remaining"], 0)
+        self.assertEqual(self.ledger.submit("alice", "sick", "2025-04-01")["reason"], "exceeds entitlement")
+        history = self.ledger.history("alice", "2025-03-05", "2025-03-06")
+        self.assertEqual([entry["date"] for entry in history], ["2025-03-05", "2025-03-06"])
+
+    def test_concurrent_requests_never_exceed_entitlement(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda day=day: results.append(
+                self.ledger.submit("alice", "leave", f"2025-06-{day:02d}")["accepted"]))
+            for day in range(1, 31)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 20)
+        self.assertEqual(len(self.ledger.history("alice")), 20)
+
+    def test_processes_sharing_the_database_never_exceed_entitlement(self):
+        other = RequestLedger(self.path)
+        self.assertEqual(self.ledger.balance("alice", "wfh", "2025-11-03")["remaining"], 3)
+        accepted = [ledger.submit("alice", "wfh", day)["accepted"]
+                    for ledger, day in ((self.ledger, "2025-11-03"), (other, "2025-11-04"),
+                                        (self.ledger, "2025-11-05"), (other, "2025-11-06"))]
+        self.assertEqual(accepted, [True, True, True, False])
+        self.assertEqual(self.ledger.balance("alice", "wfh", "2025-11-03")["remaining"], 0)
+        # Duplicates are caught across processes too
+        self.assertEqual(other.submit("alice", "wfh", "2025-11-03")["reason"], "duplicate")
+        other.close()
+
+    def test_late_arrival_time_is_recorded(self):
+        self.assertTrue(self.ledger.submit("alice", "late", "2025-11-03", reason="dentist",
+                                           arrival_time="10:30")["accepted"])
+        self.assertEqual(self.ledger.history("alice")[0]["arrival_time"], "10:30")
+
+    def test_request_that_cannot_be_stored_is_refused_alone(self):
+        # A reason SQLite can't store is refused; it neither charges the balance nor blocks other requests
+        result = self.ledger.submit("alice", "leave", "2025-11-04", reason={"note": "x"})
+        self.assertFalse(result["accepted"])
+        self.assertIn("could not be recorded", result["reason"])
+        self.assertTrue(self.ledger.submit("alice", "leave", "2025-11-05")["accepted"])
+        self.assertEqual(self.ledger.balance("alice", "leave", "2025-11-04")["used"], 1)
+        self.assertEqual([entry["date"] for entry in self.ledger.history("alice")], ["2025-11-05"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import http.client
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+import openai
+
+# Keep the test run silent and offline
+os.environ.setdefault("AUDIO_ENABLED", "false")
+# Requests must not see bookings, requests or reservations from earlier runs
+os.environ.setdefault("BOOKINGS_DB", ":memory:")
+os.environ.setdefault("REQUESTS_DB", ":memory:")
+os.environ.setdefault("INVENTORY_PATH", "")
+
+from server import AssistantServer, UserLimiter, session_key
+from office_assistant import SYSTEM_PROMPT
+from session_store import SessionStore
+from stub_server import StubOpenAIServer
+
+
+class TestAssistantServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = StubOpenAIServer().start()
+        client = openai.OpenAI(base_url=cls.stub.base_url, api_key="stub", max_retries=0)
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.store = SessionStore(os.path.join(cls.tmpdir.name, "sessions.db"), system_prompt=SYSTEM_PROMPT)
+        cls.server = AssistantServer(client, "stub-model", cls.store, user_limit=1)
+        cls.httpd = cls.server.serve("127.0.0.1", 0)
+        cls.port = cls.httpd.server_address[1]
+        threading.Thread(target=cls.httpd.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.httpd.shutdown()
+        cls.httpd.server_close()
+        cls.store.close()
+        cls.tmpdir.cleanup()
+        cls.stub.stop()
+
+    def request(self, method, path, body=None):
+        """Return (status, content type, body text)"""
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=30)
+        try:
+            connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, response.getheader("Content-Type"), response.read().decode("utf-8")
+        finally:
+            connection.close()
+
+    def chat(self, **body):
+        status, _, text = self.request("POST", "/chat", body)
+        return status, json.loads(text)
+
+    def test_chat_keeps_each_users_sessions_apart(self):
+        status, payload = self.chat(user_id="alice", session_id="s1", message="I need a day off on 2031-03-03")
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["session_id"], "s1")
+        self.assertTrue(payload["reply"])
+        history = self.store.get(session_key("alice", "s1"))
+        self.assertEqual([message["role"] for message in history][:2], ["system", "user"])
+
+        # ("a:b", "c") and ("a", "b:c") must not share a history
+        self.assertNotEqual(session_key("a:b", "c"), session_key("a", "b:c"))
+        self.chat(user_id="a:b", session_id="c", message="hello from the first")
+        self.chat(user_id="a", session_id="b:c", message="hello from the second")
+        first = [m["content"] for m in self.store.get(session_key("a:b", "c")) if m["role"] == "user"]
+        second = [m["content"] for m in self.store.get(session_key("a", "b:c")) if m["role"] == "user"]
+        self.assertEqual((first, second), (["hello from the first"], ["hello from the second"]))
+
+    def test_stream_sends_deltas_then_done(self):
+        status, content_type, text = self.request(
+            "POST", "/chat", {"user_id": "bob", "message": "What is the leave policy?", "stream": True})
+        self.assertEqual(status, 200)
+        self.assertEqual(content_type, "text/event-stream")
+        events = [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+                  for block in text.strip().split("\n\n")]
+        self.assertEqual(events[-1][0], "done")
+        self.assertTrue(all(event == "delta" for event, _ in events[:-1]))
+        self.assertEqual("".join(payload["text"] for _, payload in events[:-1]), events[-1][1]["reply"])
+
+    def test_requests_over_the_user_limit_are_refused(self):
+        self.assertTrue(self.server.user_limiter.try_acquire("carol"))
+        try:
+            status, payload = self.chat(user_id="carol", message="hello")
+            self.assertEqual(status, 429)
+        finally:
+            self.server.user_limiter.release("carol")
+        self.assertEqual(self.chat(user_id="carol", message="hello")[0], 200)
+        # Nothing is kept for users with no request in flight (the slot is released just after the reply is sent)
+        deadline = time.monotonic() + 5
+        while "carol" in self.server.user_limiter._semaphores and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertNotIn("carol", self.server.user_limiter._semaphores)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.chat(message="no user")[0], 400)
+        self.assertEqual(self.request("POST", "/chat", None)[0], 400)
+        self.assertEqual(self.request("GET", "/nowhere")[0], 404)
+
+    def test_health_usage_and_metrics(self):
+        self.chat(user_id="dave", message="hello")
+        status, _, text = self.request("GET", "/health")
+        self.assertEqual((status, json.loads(text)), (200, {"status": "ok"}))
+
+        status, _, text = self.request("GET", "/usage")
+        usage = json.loads(text)
+        self.assertEqual(status, 200)
+        self.assertIn(session_key("dave", "default"), usage["session"])
+        self.assertIn("stub-model", usage["model"])
+        self.assertIn("calls", usage["upstream"])
+
+        status, content_type, _ = self.request("GET", "/metrics")
+        self.assertEqual(status, 200)
+        self.assertTrue(content_type.startswith("text/plain"))
+
+
+class TestUserLimiter(unittest.TestCase):
+    def test_slots_are_capped_and_released(self):
+        limiter = UserLimiter(2)
+        self.assertTrue(limiter.try_acquire("alice", timeout=0))
+        self.assertTrue(limiter.try_acquire("alice", timeout=0))
+        self.assertFalse(limiter.try_acquire("alice", timeout=0.01))
+        # Other users have their own slots
+        self.assertTrue(limiter.try_acquire("bob", timeout=0))
+        for user in ("alice", "alice", "bob"):
+            limiter.release(user)
+        self.assertEqual(limiter._semaphores, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+import unittest
+from session_store import SessionStore
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "sessions.db")
+        self.store = SessionStore(self.path, max_resident=2, system_prompt="system")
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_new_session_is_seeded_and_persisted_incrementally(self):
+        history = self.store.get("alice")
+        self.assertEqual(history, [{"role": "system", "content": "system"}])
+
+        history.append({"role": "user", "content": "hi"})
+        self.store.save("alice", history)
+        history.append({"role": "assistant", "content": "hello"})
+        self.store.save("alice", history)
+
+        reopened = SessionStore(self.path)
+        self.assertEqual(reopened.get("alice"), history)
+        reopened.close()
+
+    def test_processes_appending_to_one_session_keep_each_others_messages(self):
+        other = SessionStore(self.path, system_prompt="system")
+        mine, theirs = self.store.get("alice"), other.get("alice")
+        mine.append({"role": "user", "content": "from one"})
+        self.store.save("alice", mine)
+        theirs.append({"role": "user", "content": "from two"})
+        other.save("alice", theirs)
+        other.close()
+
+        reopened = SessionStore(self.path)
+        self.assertEqual([message["content"] for message in reopened.get("alice")],
+                         ["system", "from one", "system", "from two"])
+        reopened.close()
+
+    def test_lru_eviction_reloads_lazily(self):
+        for user in ("a", "b", "c"):
+            history = self.store.get(user)
+            history.append({"role": "user", "content": f"from {user}"})
+            self.store.save(user, history)
+
+        self.assertEqual(self.store.resident_count(), 2)
+        self.assertEqual(self.store.get("a")[-1], {"role": "user", "content": "from a"})
+
+    def test_idle_sessions_are_evicted(self):
+        self.store.idle_seconds = 0
+        history = self.store.get("idle")
+        history.append({"role": "user", "content": "unsaved"})
+        self.assertEqual(self.store.evict_idle(), 1)
+        self.assertEqual(self.store.get("idle")[-1]["content"], "unsaved")
+
+    def test_concurrent_writers(self):
+        def worker(user):
+            for i in range(20):
+                with self.store.session_lock(user):
+                    history = self.store.get(user)
+                    history.append({"role": "user", "content": str(i)})
+                    self.store.save(user, history)
+
+        threads = [threading.Thread(target=worker, args=(f"user{n % 4}",)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reopened = SessionStore(self.path)
+        for n in range(4):
+            # system prompt + 2 writers x 20 messages
+            self.assertEqual(len(reopened.get(f"user{n}")), 41)
+        reopened.close()
+
+    def test_concurrent_writers_with_eviction_churn(self):
+        # With one resident session every turn evicts another session while its owners race for it
+        store = SessionStore(self.path, max_resident=1, system_prompt="system")
+
+        def worker(user):
+            for i in range(30):
+                with store.session_lock(user):
+                    history = store.get(user)
+                    history.append({"role": "user", "content": str(i)})
+                    store.save(user, history)
+
+        threads = [threading.Thread(target=worker, args=(f"churn{n % 4}",)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.close()
+
+        reopened = SessionStore(self.path)
+        for n in range(4):
+            history = reopened.get(f"churn{n}")
+            self.assertEqual(len(history), 61)
+            self.assertEqual(sorted(int(m["content"]) for m in history[1:]), sorted(list(range(30)) * 2))
+        reopened.close()
+
+    def test_locked_sessions_are_not_evicted_and_locks_are_released(self):
+        with self.store.session_lock("busy"):
+            history = self.store.get("busy")
+            history.append({"role": "user", "content": "in progress"})
+            for user in ("b", "c", "d"):
+                self.store.get(user)
+            self.assertIs(self.store.get("busy"), history)
+        self.assertEqual(self.store._session_locks, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+import telemetry
+
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.was_enabled = telemetry.is_enabled()
+        telemetry.reset()
+
+    def tearDown(self):
+        telemetry.reset()
+        if self.was_enabled:
+            telemetry.enable()
+        else:
+            telemetry.disable()
+
+    def test_disabled_spans_record_nothing(self):
+        telemetry.disable()
+        with telemetry.span("completion", stage="first") as s:
+            s.set(hit=True)
+        telemetry.record("audio.first", 12.0)
+        # Every disabled span is the same shared no-op object
+        self.assertIs(telemetry.span("a"), telemetry.span("b", tool="x"))
+        self.assertEqual(telemetry.summary(), {})
+        self.assertEqual(telemetry.export_jsonl(), "")
+
+    def test_summary_groups_by_name_and_labels(self):
+        telemetry.enable()
+        telemetry.record("completion", 10.0, {"stage": "first", "tokens": 5})
+        telemetry.record("completion", 30.0, {"stage": "first", "tokens": 7})
+        telemetry.record("completion", 4.0, {"stage": "second"})
+        telemetry.record("policy.search", 2.0)
+        with self.assertRaises(ValueError):
+            with telemetry.span("tool", tool="book_meeting_room") as s:
+                s.set(hit=False)
+                raise ValueError("boom")
+
+        summary = telemetry.summary()
+        self.assertEqual(summary["completion[stage=first]"], {"count": 2, "sum_ms": 40.0, "mean_ms": 20.0})
+        self.assertEqual(summary["completion[stage=second]"]["count"], 1)
+        self.assertEqual(summary["policy.search"]["mean_ms"], 2.0)
+        # Labels keep LABEL_KEYS order; set() attributes and errors are included
+        self.assertEqual(summary["tool[tool=book_meeting_room][hit=False]"]["count"], 1)
+
+        spans = [json.loads(line) for line in telemetry.export_jsonl().splitlines()]
+        self.assertEqual(len(spans), 5)
+        self.assertEqual(spans[0]["tokens"], 5)
+        self.assertEqual(spans[-1]["error"], "ValueError")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "spans.jsonl")
+            telemetry.export_jsonl(path)
+            with open(path, "r", encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 5)
+
+    def test_prometheus_histogram_format(self):
+        telemetry.enable()
+        telemetry.record("policy.search", 3.0)
+        telemetry.record("policy.search", 40.0)
+        telemetry.record("completion", 60000.0, {"stage": "first"})
+
+        lines = telemetry.export_prometheus().splitlines()
+        metric = "office_assistant_policy_search_seconds"
+        self.assertIn(f"# TYPE {metric} histogram", lines)
+        buckets = [line for line in lines if line.startswith(f"{metric}_bucket")]
+        self.assertEqual(len(buckets), len(telemetry.BUCKETS_MS) + 1)
+        # Buckets are cumulative, in seconds, ending with +Inf
+        self.assertIn(f'{metric}_bucket{{le="0.001"}} 0', lines)
+        self.assertIn(f'{metric}_bucket{{le="0.005"}} 1', lines)
+        self.assertIn(f'{metric}_bucket{{le="0.05"}} 2', lines)
+        self.assertEqual(buckets[-1], f'{metric}_bucket{{le="+Inf"}} 2')
+        self.assertIn(f"{metric}_sum 0.043", lines)
+        self.assertIn(f"{metric}_count 2", lines)
+
+        labelled = "office_assistant_completion_seconds"
+        self.assertIn(f'{labelled}_bucket{{stage="first",le="30.0"}} 0', lines)
+        self.assertIn(f'{labelled}_bucket{{stage="first",le="+Inf"}} 1', lines)
+        self.assertIn(f'{labelled}_count{{stage="first"}} 1', lines)
+
+    def test_prometheus_export_is_empty_without_spans(self):
+        self.assertEqual(telemetry.export_prometheus(), "\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
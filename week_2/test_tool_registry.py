@@ -0,0 +1,84 @@
+import unittest
+from tool_registry import ToolRegistry, Param
+
+
+class TestToolRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ToolRegistry()
+
+        @self.registry.register(
+            "Book a meeting room for a specific time.",
+            date=Param("string", "The date for the meeting in YYYY-MM-DD format", format="date"),
+            start_time=Param("string", "Start time of the meeting in HH:MM format", format="time"),
+            duration=Param("number", "Duration of the meeting in hours", minimum=0.25, maximum=10),
+            note=Param("string", "Optional note", required=False),
+        )
+        def book(date, start_time, duration, note=None):
+            return f"{date} {start_time} {duration:g}"
+
+    def test_schema_is_generated_from_registration(self):
+        schema = self.registry.schemas()[0]["function"]
+        self.assertEqual(schema["name"], "book")
+        self.assertEqual(list(schema["parameters"]["properties"]), ["date", "start_time", "duration", "note"])
+        self.assertEqual(schema["parameters"]["required"], ["date", "start_time", "duration"])
+        # Limits are part of the schema so the model can respect them up front
+        self.assertEqual(schema["parameters"]["properties"]["duration"],
+                         {"type": "number", "minimum": 0.25, "maximum": 10,
+                          "description": "Duration of the meeting in hours"})
+
+    def test_unambiguous_arguments_are_repaired(self):
+        arguments, error = self.registry.validate(
+            "book", {"date": "2025/11/1", "start_time": "9:00", "duration": "1.5 hours"}
+        )
+        self.assertIsNone(error)
+        self.assertEqual(arguments, {"date": "2025-11-01", "start_time": "09:00", "duration": 1.5})
+        self.assertEqual(self.registry.validate("book", {"date": "2025-11-01", "start_time": "2:30 pm",
+                                                         "duration": 1})[0]["start_time"], "14:30")
+
+    def test_invalid_arguments_are_rejected_with_every_error(self):
+        arguments, error = self.registry.validate(
+            "book", {"date": "2025-02-30", "start_time": "9", "duration": 24}
+        )
+        self.assertIsNone(arguments)
+        self.assertIn("not a valid calendar date", error)
+        self.assertIn("'9' is not a time in HH:MM format", error)
+        self.assertIn("at most 10", error)
+
+        _, error = self.registry.validate("book", {"date": "2025-11-01"})
+        self.assertIn("missing required parameter 'start_time'", error)
+        self.assertIn("missing required parameter 'duration'", error)
+
+    def test_integers_must_be_whole(self):
+        @self.registry.register("Reserve laptops.", count=Param("integer", "How many", minimum=1))
+        def reserve(count):
+            return count
+
+        for value in (3, 3.0, "3", "3.0", "3 laptops"):
+            arguments, error = self.registry.validate("reserve", {"count": value})
+            self.assertIsNone(error)
+            self.assertEqual(arguments, {"count": 3})
+            self.assertIs(type(arguments["count"]), int)
+        for value in (2.7, "2.7", "2.5 laptops"):
+            arguments, error = self.registry.validate("reserve", {"count": value})
+            self.assertIsNone(arguments)
+            self.assertIn("'count' must be a whole number", error)
+
+    def test_dispatch(self):
+        self.assertEqual(self.registry.dispatch("book", {"date": "2025-11-01", "start_time": "10:00",
+                                                         "duration": 2}), ("2025-11-01 10:00 2", None))
+        result, error = self.registry.dispatch("book", {})
+        self.assertTrue(error.startswith("Invalid arguments for book"))
+        self.assertEqual(result, f"Error: {error}")
+        self.assertEqual(self.registry.dispatch("missing", {}),
+                         ("Error: Unknown function: missing", "Unknown function: missing"))
+
+    def test_dispatch_reports_function_errors(self):
+        @self.registry.register("Always fails.")
+        def broken():
+            raise RuntimeError("database is locked")
+
+        self.assertEqual(self.registry.dispatch("broken", {}), ("Error executing function: database is locked", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
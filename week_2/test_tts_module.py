@@ -0,0 +1,137 @@
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+import tts_module
+from tts_module import TTSModelRegistry, SentenceSplitter, StreamingSpeaker
+
+
+class TestTTSModelRegistry(unittest.TestCase):
+    def test_failed_load_is_not_cached(self):
+        registry = TTSModelRegistry(memory_budget_bytes=1024)
+        with mock.patch("tts_module.VitsModel") as vits:
+            vits.from_pretrained.side_effect = OSError("offline")
+            manager = registry.get("missing/model")
+        self.assertIsNone(manager.model)
+        self.assertEqual(registry.stats(), {})
+
+        # The next request loads again instead of getting the failed manager
+        with mock.patch.object(tts_module.TTSManager, "_load_model") as load:
+            registry.get("missing/model")
+        load.assert_called_once()
+
+    def test_retry_after_failed_load_runs_once(self):
+        registry = TTSModelRegistry(memory_budget_bytes=1024)
+        first_started, release_first, retry_started = threading.Event(), threading.Event(), threading.Event()
+        state = {"loads": 0, "active": 0, "max_active": 0}
+        state_lock = threading.Lock()
+
+        def load(manager):
+            with state_lock:
+                attempt = state["loads"]
+                state["loads"] += 1
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+            if attempt == 0:
+                first_started.set()
+                release_first.wait()
+                manager._loaded = None
+            else:
+                retry_started.set()
+                time.sleep(0.2)
+                model = mock.Mock()
+                model.parameters.return_value = []
+                model.buffers.return_value = []
+                manager._loaded = (model, None)
+            with state_lock:
+                state["active"] -= 1
+
+        with mock.patch.object(tts_module.TTSManager, "_load_model", load):
+            threads = [threading.Thread(target=registry.get, args=("some/model",))]
+            threads[0].start()
+            first_started.wait()
+            # Waits on the load lock while the first load is failing
+            threads.append(threading.Thread(target=registry.get, args=("some/model",)))
+            threads[1].start()
+            time.sleep(0.05)
+            release_first.set()
+            retry_started.wait()
+            # Arrives while the waiter retries; must wait for it rather than load alongside it
+            threads.append(threading.Thread(target=registry.get, args=("some/model",)))
+            threads[2].start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual((state["loads"], state["max_active"]), (2, 1))
+        self.assertIn("some/model", registry.stats())
+
+    def test_unload_drops_model_and_tokenizer_together(self):
+        with mock.patch.object(tts_module.TTSManager, "_load_model"):
+            manager = tts_module.TTSManager("some/model", device="cpu")
+        manager._loaded = (mock.Mock(), mock.Mock())
+        manager.unload()
+        self.assertIsNone(manager.model)
+        self.assertIsNone(manager.tokenizer)
+        self.assertIsNone(manager.text_to_speech("Hello there"))
+
+
+class TestSentenceSplitter(unittest.TestCase):
+    def split(self, deltas):
+        splitter = SentenceSplitter(min_chars=5)
+        sentences = []
+        for delta in deltas:
+            sentences.extend(splitter.feed(delta))
+        return sentences, splitter.flush()
+
+    def test_sentences_complete_across_deltas(self):
+        sentences, rest = self.split(["Your request ", "is submitted. Ro", "om A1 is **booked**!\nAnything else"])
+        self.assertEqual(sentences, ["Your request is submitted.", "Room A1 is booked!"])
+        self.assertEqual(rest, ["Anything else"])
+
+    def test_abbreviations_do_not_end_sentences(self):
+        sentences, rest = self.split(["Bring a laptop, e.g. a MacBook, etc. for the demo. ", "Then relax."])
+        self.assertEqual(sentences, ["Bring a laptop, e.g. a MacBook, etc. for the demo."])
+        self.assertEqual(rest, ["Then relax."])
+
+    def test_no_is_an_abbreviation_only_before_a_number(self):
+        sentences, _ = self.split(["See policy No. 5 for details. ", "The answer is no. ", "Ask HR instead. "])
+        self.assertEqual(sentences, ["See policy No. 5 for details.", "The answer is no.", "Ask HR instead."])
+        # Words merely ending in "no" are not abbreviations either
+        sentences, _ = self.split(["He plays the piano. ", "She sings. "])
+        self.assertEqual(sentences, ["He plays the piano.", "She sings."])
+
+    def test_short_fragments_are_merged(self):
+        sentences = SentenceSplitter(min_chars=20).feed("Done. Your leave is approved. ")
+        self.assertEqual(sentences, ["Done. Your leave is approved."])
+
+
+class TestStreamingSpeaker(unittest.TestCase):
+    def test_audio_files_are_removed_after_playback(self):
+        paths = []
+
+        def synthesize(text, output_path):
+            paths.append(output_path)
+            return output_path
+
+        tts = mock.Mock(text_to_speech=synthesize)
+        with mock.patch("tts_module.get_tts_instance", return_value=tts):
+            speaker = StreamingSpeaker(play_audio=True)
+            speaker.feed("First sentence.")
+            speaker.feed("Second sentence.")
+            self.assertEqual(speaker.close(), 2)
+        self.assertEqual(tts.play_audio.call_count, 2)
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+        self.assertIsNotNone(speaker.first_audio_latency)
+
+    def test_close_returns_when_synthesis_fails(self):
+        with mock.patch("tts_module.get_tts_instance", side_effect=RuntimeError("no model")):
+            speaker = StreamingSpeaker(play_audio=False)
+            speaker.feed("Hello there.")
+            self.assertEqual(speaker.close(), 0)
+            # Closing again is harmless
+            self.assertEqual(speaker.close(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
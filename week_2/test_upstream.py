@@ -0,0 +1,171 @@
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+import httpx
+import openai
+from upstream import CircuitBreaker, Deadline, LatencyWindow, ResilientCaller, UpstreamUnavailable
+
+
+def server_error():
+    request = httpx.Request("POST", "http://upstream/v1/chat/completions")
+    return openai.InternalServerError("upstream failed", response=httpx.Response(500, request=request), body=None)
+
+
+class FakeClient:
+    """Answers with each scripted outcome in turn: an exception to raise, or (delay, value)"""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            outcome = self.outcomes[min(self.calls, len(self.outcomes) - 1)]
+            self.calls += 1
+        if isinstance(outcome, Exception):
+            raise outcome
+        delay, value = outcome
+        time.sleep(delay)
+        return value
+
+
+class Closable:
+    def __init__(self, total_tokens=0):
+        self.closed = False
+        self.usage = SimpleNamespace(total_tokens=total_tokens)
+
+    def close(self):
+        self.closed = True
+
+
+class DribblingStream(Closable):
+    """A stream that yields a chunk every `interval` seconds"""
+
+    def __init__(self, chunks, interval):
+        super().__init__()
+        self.chunks = chunks
+        self.interval = interval
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            time.sleep(self.interval)
+            yield chunk
+
+
+def bad_request():
+    request = httpx.Request("POST", "http://upstream")
+    return openai.BadRequestError("bad", response=httpx.Response(400, request=request), body=None)
+
+
+class TestResilientCaller(unittest.TestCase):
+    def test_transient_errors_are_retried(self):
+        client = FakeClient([server_error(), server_error(), (0, "ok")])
+        caller = ResilientCaller(max_retries=2, base_delay=0.01)
+        self.assertEqual(caller.call(client, Deadline(5), model="m"), "ok")
+        self.assertEqual((client.calls, caller.stats()["retries"]), (3, 2))
+
+    def test_non_transient_errors_are_not_retried(self):
+        client = FakeClient([bad_request()])
+        with self.assertRaises(openai.BadRequestError):
+            ResilientCaller(max_retries=3, base_delay=0.01).call(client, Deadline(5))
+        self.assertEqual(client.calls, 1)
+
+    def test_expired_deadline_fails_without_calling(self):
+        client = FakeClient([(0, "ok")])
+        with self.assertRaises(UpstreamUnavailable):
+            ResilientCaller().call(client, Deadline(0))
+        self.assertEqual(client.calls, 0)
+
+    def test_circuit_opens_then_half_opens(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+        caller = ResilientCaller(max_retries=0, breaker=breaker)
+        failing = FakeClient([server_error()])
+        for _ in range(2):
+            with self.assertRaises(openai.InternalServerError):
+                caller.call(failing, Deadline(5))
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(UpstreamUnavailable):
+            caller.call(failing, Deadline(5))
+        self.assertEqual(failing.calls, 2)
+
+        time.sleep(0.06)
+        # One probe is let through; its success closes the circuit
+        self.assertEqual(caller.call(FakeClient([(0, "ok")]), Deadline(5)), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_bad_request_probe_leaves_circuit_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0.05)
+        caller = ResilientCaller(max_retries=0, breaker=breaker)
+        with self.assertRaises(openai.InternalServerError):
+            caller.call(FakeClient([server_error()]), Deadline(5))
+        time.sleep(0.06)
+        with self.assertRaises(openai.BadRequestError):
+            caller.call(FakeClient([bad_request()]), Deadline(5))
+        # The probe slot is freed without closing the circuit; the next call probes again
+        self.assertEqual(breaker.state, "half_open")
+        with self.assertRaises(openai.InternalServerError):
+            caller.call(FakeClient([server_error()]), Deadline(5))
+        self.assertEqual(breaker.state, "open")
+
+    def test_slow_call_is_hedged(self):
+        latencies = LatencyWindow(min_samples=5)
+        for _ in range(5):
+            latencies.add(0.01)
+        caller = ResilientCaller(hedge=True, min_hedge_delay=0.02, latencies={False: latencies})
+        slow = Closable(total_tokens=7)
+        client = FakeClient([(0.3, slow), (0, "fast")])
+        start = time.monotonic()
+        self.assertEqual(caller.call(client, Deadline(5)), "fast")
+        self.assertLess(time.monotonic() - start, 0.2)
+        self.assertEqual((caller.stats()["hedges"], caller.stats()["hedge_wins"]), (1, 1))
+        # The losing response is closed once it arrives
+        time.sleep(0.4)
+        self.assertTrue(slow.closed)
+        # Tokens billed for the discarded response are accounted for
+        self.assertEqual(caller.stats()["hedge_discarded_tokens"], 7)
+
+    def test_hedged_call_keeps_to_its_deadline(self):
+        latencies = LatencyWindow(min_samples=5)
+        for _ in range(5):
+            latencies.add(0.01)
+        caller = ResilientCaller(max_retries=0, hedge=True, min_hedge_delay=0.02, latencies={False: latencies})
+        responses = [Closable(), Closable()]
+        client = FakeClient([(0.5, responses[0]), (0.5, responses[1])])
+        start = time.monotonic()
+        with self.assertRaises(openai.APITimeoutError):
+            caller.call(client, Deadline(0.2))
+        self.assertLess(time.monotonic() - start, 0.3)
+        time.sleep(0.5)
+        self.assertTrue(all(response.closed for response in responses))
+
+    def test_stream_body_is_bounded_by_the_deadline(self):
+        stream = DribblingStream(["a", "b", "c", "d", "e"], 0.1)
+        caller = ResilientCaller()
+        chunks = []
+        start = time.monotonic()
+        with self.assertRaises(openai.APITimeoutError):
+            for chunk in caller.call(FakeClient([(0, stream)]), Deadline(0.25), stream=True):
+                chunks.append(chunk)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(chunks, ["a", "b"])
+        self.assertTrue(stream.closed)
+
+        # A stream that finishes in time is passed through whole
+        stream = DribblingStream(["a", "b"], 0)
+        self.assertEqual(list(caller.call(FakeClient([(0, stream)]), Deadline(5), stream=True)), ["a", "b"])
+
+    def test_streamed_and_whole_responses_keep_separate_latencies(self):
+        caller = ResilientCaller(latencies={False: LatencyWindow(min_samples=1), True: LatencyWindow(min_samples=1)})
+        caller.call(FakeClient([(0.05, "whole")]), Deadline(5))
+        caller.call(FakeClient([(0, "stream")]), Deadline(5), stream=True)
+        stats = caller.stats()
+        self.assertGreaterEqual(stats["p95_seconds"], 0.05)
+        self.assertLess(stats["stream_p95_seconds"], 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from types import SimpleNamespace
+from usage_ledger import UsageLedger
+
+
+def usage(prompt, completion, cached=0):
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion,
+                           prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+
+
+class TestUsageLedger(unittest.TestCase):
+    def test_record_aggregates_by_session_model_tool_and_stage(self):
+        ledger = UsageLedger()
+        ledger.record("s1", "m", "first", usage(100, 20, cached=64), ["book_meeting_room"], 3, 90)
+        ledger.record("s1", "m", "second", usage(150, 30), ["book_meeting_room"], 5, 140)
+        ledger.record("s2", "m", "first", usage(80, 10))
+
+        self.assertEqual(ledger.totals("session")["s1"], {"calls": 2, "prompt_tokens": 250, "completion_tokens": 50,
+                                                          "cached_tokens": 64, "total_tokens": 300})
+        self.assertEqual(ledger.totals("model")["m"]["total_tokens"], 390)
+        self.assertEqual(ledger.totals("tool"), {"book_meeting_room": ledger.totals("session")["s1"]})
+        self.assertEqual(ledger.totals("stage")["first"]["calls"], 2)
+        self.assertEqual(ledger.session_tokens("s2"), 90)
+        self.assertEqual(ledger.session_tokens("unknown"), 0)
+        self.assertEqual(ledger.entries[0]["history_tokens"], 90)
+
+    def test_missing_usage_records_a_call_without_tokens(self):
+        ledger = UsageLedger()
+        entry = ledger.record("s1", "m", "first", None)
+        self.assertEqual((entry["prompt_tokens"], entry["completion_tokens"]), (0, 0))
+        self.assertEqual(ledger.totals("session")["s1"]["calls"], 1)
+
+    def test_check_budget_before_sending(self):
+        self.assertIsNone(UsageLedger().check_budget("s1", 10 ** 9))
+
+        ledger = UsageLedger(session_budget_tokens=500)
+        ledger.record("s1", "m", "first", usage(300, 100))
+        self.assertIsNone(ledger.check_budget("s1", 100))
+        error = ledger.check_budget("s1", 101)
+        self.assertIn("used 400 of its 500 token budget", error)
+        # Other sessions have their own budget
+        self.assertIsNone(ledger.check_budget("s2", 500))
+
+    def test_session_totals_are_bounded(self):
+        ledger = UsageLedger(max_sessions=2)
+        for session_id in ("a", "b", "a", "c"):
+            ledger.record(session_id, "m", "first", usage(10, 1))
+        # "b" was the least recently active; model totals keep every call
+        self.assertEqual(list(ledger.totals("session")), ["a", "c"])
+        self.assertEqual(ledger.totals("model")["m"]["calls"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,289 @@
+"""
+Table-driven tool registry: generates the `tools` JSON schemas from registered
+functions, validates (and where unambiguous repairs) arguments locally, and
+dispatches calls with a dict lookup
+"""
+import re
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class ToolValidationError(ValueError):
+    """Raised when tool arguments are missing or malformed and can't be repaired"""
+
+
+class Param:
+    """Declaration of one tool parameter"""
+
+    def __init__(self, type: str, description: str, required: bool = True, format: Optional[str] = None,
+                 minimum: Optional[float] = None, maximum: Optional[float] = None,
+                 items: Optional[Dict] = None, min_items: Optional[int] = None, enum: Optional[List[str]] = None):
+        """
+        Args:
+            type: JSON schema type ("string", "number", "integer", "array")
+            description: Description shown to the model
+            required: Whether the model must supply it
+            format: "date" (YYYY-MM-DD) or "time" (HH:MM) for strings
+            minimum: Smallest allowed number
+            maximum: Largest allowed number
+            items: JSON schema of array items
+            min_items: Smallest allowed array length
+            enum: Allowed string values
+        """
+        self.type = type
+        self.description = description
+        self.required = required
+        self.format = format
+        self.minimum = minimum
+        self.maximum = maximum
+        self.items = items
+        self.min_items = min_items
+        self.enum = enum
+
+    def schema(self) -> Dict:
+        schema = {"type": self.type}
+        if self.items is not None:
+            schema["items"] = self.items
+        if self.min_items is not None:
+            schema["minItems"] = self.min_items
+        if self.minimum is not None:
+            schema["minimum"] = self.minimum
+        if self.maximum is not None:
+            schema["maximum"] = self.maximum
+        if self.enum is not None:
+            schema["enum"] = self.enum
+        schema["description"] = self.description
+        return schema
+
+
+_DATE_RE = re.compile(r"^\s*(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})\s*$")
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?:[:.h](\d{2}))?\s*([ap]\.?m\.?)?\s*$", re.IGNORECASE)
+_NUMBER_RE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)")
+
+
+def _repair_date(value):
+    """Normalize YYYY-M-D / YYYY/MM/DD / YYYY.MM.DD to YYYY-MM-DD and check it is a real date"""
+    match = _DATE_RE.match(str(value))
+    if not match:
+        raise ToolValidationError(f"'{value}' is not a date in YYYY-MM-DD format")
+    year, month, day = (int(part) for part in match.groups())
+    try:
+        return datetime(year, month, day).strftime("%Y-%m-%d")
+    except ValueError:
+        raise ToolValidationError(f"'{value}' is not a valid calendar date")
+
+
+def _repair_time(value):
+    """Normalize 9:00 / 9.30 / 2pm / 2:30 PM to HH:MM (24-hour) and check it is a real time"""
+    match = _TIME_RE.match(str(value))
+    if not match:
+        raise ToolValidationError(f"'{value}' is not a time in HH:MM format")
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if meridiem is None and match.group(2) is None:
+        # A bare number like "9" is too ambiguous to repair
+        raise ToolValidationError(f"'{value}' is not a time in HH:MM format")
+    if meridiem:
+        if not 1 <= hour <= 12:
+            raise ToolValidationError(f"'{value}' is not a valid time")
+        hour = hour % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    if hour > 23 or minute > 59:
+        raise ToolValidationError(f"'{value}' is not a valid time")
+    return f"{hour:02d}:{minute:02d}"
+
+
+def _compile_validator(name: str, param: Param) -> Callable:
+    """Build the checks for one parameter once, so each call only runs what applies"""
+    steps = []
+
+    if param.type in ("number", "integer"):
+        cast = int if param.type == "integer" else float
+
+        def to_number(value):
+            if isinstance(value, bool):
+                raise ToolValidationError(f"'{name}' must be a number")
+            if isinstance(value, int):
+                return cast(value)
+            if isinstance(value, float):
+                number = value
+            else:
+                # Repair "3", "3.5" or "3 hours"
+                match = _NUMBER_RE.match(str(value))
+                if not match:
+                    raise ToolValidationError(f"'{name}' must be a number, got '{value}'")
+                number = float(match.group(1))
+            # Reject 2.7 rather than truncating it to 2
+            if cast is int and not number.is_integer():
+                raise ToolValidationError(f"'{name}' must be a whole number, got '{value}'")
+            return cast(number)
+        steps.append(to_number)
+
+        if param.minimum is not None:
+            def check_minimum(value):
+                if value < param.minimum:
+                    raise ToolValidationError(f"'{name}' must be at least {param.minimum}, got {value}")
+                return value
+            steps.append(check_minimum)
+        if param.maximum is not None:
+            def check_maximum(value):
+                if value > param.maximum:
+                    raise ToolValidationError(f"'{name}' must be at most {param.maximum}, got {value}")
+                return value
+            steps.append(check_maximum)
+
+    elif param.type == "array":
+        def to_list(value):
+            if isinstance(value, str):
+                # Repair "laptop, monitor" into a list
+                value = [part.strip() for part in re.split(r",|\band\b", value) if part.strip()]
+            if not isinstance(value, list):
+                raise ToolValidationError(f"'{name}' must be a list")
+            return value
+        steps.append(to_list)
+        if param.min_items is not None:
+            def check_length(value):
+                if len(value) < param.min_items:
+                    raise ToolValidationError(f"'{name}' needs at least {param.min_items} item(s)")
+                return value
+            steps.append(check_length)
+
+    else:
+        def to_string(value):
+            if isinstance(value, (dict, list)):
+                raise ToolValidationError(f"'{name}' must be text")
+            value = str(value).strip()
+            if not value:
+                raise ToolValidationError(f"'{name}' must not be empty")
+            return value
+        steps.append(to_string)
+        if param.format == "date":
+            steps.append(_repair_date)
+        elif param.format == "time":
+            steps.append(_repair_time)
+        if param.enum is not None:
+            allowed = {value.lower(): value for value in param.enum}
+
+            def check_enum(value):
+                # Repair case differences such as "Sick"
+                if value.lower() not in allowed:
+                    raise ToolValidationError(f"'{name}' must be one of {', '.join(param.enum)}, got '{value}'")
+                return allowed[value.lower()]
+            steps.append(check_enum)
+
+    def validate(value):
+        for step in steps:
+            value = step(value)
+        return value
+    return validate
+
+
+class Tool:
+    """A registered function with its schema and compiled validators"""
+
+    def __init__(self, name: str, description: str, function: Callable, params: Dict[str, Param]):
+        self.name = name
+        self.description = description
+        self.function = function
+        self.params = params
+        self.required = [key for key, param in params.items() if param.required]
+        self.validators = {key: _compile_validator(key, param) for key, param in params.items()}
+        self.schema = {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "parameters": {
+                    "type": "object",
+                    "properties": {key: param.schema() for key, param in params.items()},
+                    "required": self.required,
+                },
+            },
+        }
+
+    def validate(self, arguments: Dict) -> Dict:
+        """
+        Check and repair arguments
+
+        Returns:
+            Cleaned arguments, containing only declared parameters
+
+        Raises:
+            ToolValidationError: listing every problem found
+        """
+        if not isinstance(arguments, dict):
+            raise ToolValidationError("arguments must be a JSON object")
+        errors = [f"missing required parameter '{key}'" for key in self.required
+                  if arguments.get(key) in (None, "")]
+        cleaned = {}
+        for key, validator in self.validators.items():
+            value = arguments.get(key)
+            if value in (None, ""):
+                continue
+            try:
+                cleaned[key] = validator(value)
+            except ToolValidationError as e:
+                errors.append(str(e))
+        if errors:
+            raise ToolValidationError("; ".join(errors))
+        return cleaned
+
+
+class ToolRegistry:
+    """Maps tool names to functions, schemas and validators"""
+
+    def __init__(self):
+        self._tools: Dict[str, Tool] = {}
+        self._schemas: List[Dict] = []
+
+    def register(self, description: str, name: Optional[str] = None, **params: Param):
+        """
+        Decorator registering a function as a tool
+
+        Args:
+            description: Tool description shown to the model
+            name: Tool name (defaults to the function name)
+            **params: Parameter declarations, in schema order
+        """
+        def decorator(function):
+            tool = Tool(name or function.__name__, description, function, params)
+            self._tools[tool.name] = tool
+            self._schemas = [t.schema for t in self._tools.values()]
+            return function
+        return decorator
+
+    def schemas(self) -> List[Dict]:
+        """The `tools` list to send with chat completions"""
+        return self._schemas
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def validate(self, name: str, arguments: Dict) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        Validate a tool call without running it
+
+        Returns:
+            (cleaned arguments, None) if valid, (None, error message) otherwise
+        """
+        tool = self._tools.get(name)
+        if tool is None:
+            return None, f"Unknown function: {name}"
+        try:
+            return tool.validate(arguments), None
+        except ToolValidationError as e:
+            return None, f"Invalid arguments for {name}: {e}"
+
+    def dispatch(self, name: str, arguments: Dict) -> Tuple[str, Optional[str]]:
+        """
+        Validate and run a tool call
+
+        Returns:
+            (result, None) if the function ran (its result, or an error message if it raised);
+            ("Error: ...", validation error) if the call was rejected without running
+        """
+        cleaned, error = self.validate(name, arguments)
+        if error:
+            return f"Error: {error}", error
+        try:
+            return self._tools[name].function(**cleaned), None
+        except Exception as e:
+            return f"Error executing function: {str(e)}", None
@@ -2,12 +2,18 @@
 Text-to-Speech module using HuggingFace VITS models
 """
 import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
 import torch
 from transformers import VitsModel, AutoTokenizer
 import soundfile as sf
 import tempfile
-from typing import Optional, Union
+from typing import Dict, List, Optional, Union
 import warnings
+from telemetry import span
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings("ignore")
@@ -28,9 +34,10 @@ class TTSManager:
         """
         self.model_name = model_name
         self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = None
-        self.tokenizer = None
+        # (model, tokenizer) is replaced as one pair so a reader never sees half of an unload
+        self._loaded = None
         self.sample_rate = 16000  # Default sample rate for most VITS models
+        self.load_seconds = 0.0
         
         print(f"Initializing TTS with model: {model_name}")
         print(f"Using device: {self.device}")
@@ -39,25 +46,51 @@ class TTSManager:
     
     def _load_model(self):
         """Load the VITS model and tokenizer"""
+        start = time.perf_counter()
         try:
             print("Loading VITS model...")
-            self.model = VitsModel.from_pretrained(self.model_name)
-            self.model.to(self.device)
+            model = VitsModel.from_pretrained(self.model_name)
+            model.to(self.device)
+            self.sample_rate = getattr(model.config, "sampling_rate", self.sample_rate)
             
             # Try to get tokenizer, fallback to basic if not available
             try:
-                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                tokenizer = AutoTokenizer.from_pretrained(self.model_name)
             except:
                 print("No tokenizer found, using basic text processing")
-                self.tokenizer = None
+                tokenizer = None
             
+            self._loaded = (model, tokenizer)
             print("TTS model loaded successfully!")
             
         except Exception as e:
             print(f"Error loading TTS model: {e}")
             print("Falling back to basic TTS functionality")
-            self.model = None
-            self.tokenizer = None
+            self._loaded = None
+        finally:
+            self.load_seconds = time.perf_counter() - start
+    
+    @property
+    def model(self):
+        return self._loaded[0] if self._loaded else None
+    
+    @property
+    def tokenizer(self):
+        return self._loaded[1] if self._loaded else None
+    
+    def memory_bytes(self) -> int:
+        """Resident size of the model weights and buffers in bytes"""
+        model = self.model
+        if not model:
+            return 0
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    
+    def unload(self):
+        """Release the model so its memory can be reclaimed"""
+        self._loaded = None
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
     
     def text_to_speech(self, text: str, output_path: Optional[str] = None) -> Union[str, None]:
         """
@@ -70,9 +103,13 @@ class TTSManager:
         Returns:
             Path to generated audio file or None if failed
         """
-        if not self.model:
+        # Take the model and its tokenizer together so a concurrent registry eviction can't
+        # unload either of them mid-synthesis
+        loaded = self._loaded
+        if not loaded:
             print("TTS model not available")
             return None
+        model, tokenizer = loaded
         
         try:
             # Clean and prepare text
@@ -84,17 +121,19 @@ class TTSManager:
             print(f"Generating speech for: {text[:50]}...")
             
             # Tokenize text if tokenizer is available
-            if self.tokenizer:
-                inputs = self.tokenizer(text, return_tensors="pt")
+            if tokenizer:
+                inputs = tokenizer(text, return_tensors="pt")
                 input_ids = inputs["input_ids"].to(self.device)
             else:
                 # Basic text processing
                 input_ids = torch.tensor([[ord(c) for c in text[:100]]]).to(self.device)
             
             # Generate audio
-            with torch.no_grad():
-                outputs = self.model(input_ids)
-                waveform = outputs.waveform
+            with span("tts.synthesize", model=self.model_name, chars=len(text)) as synth_span:
+                with torch.no_grad():
+                    outputs = model(input_ids)
+                    waveform = outputs.waveform
+                synth_span.set(audio_seconds=waveform.shape[-1] / self.sample_rate)
             
             # Convert to numpy and ensure correct format
             audio_np = waveform.squeeze().cpu().numpy()
@@ -190,15 +229,96 @@ class TTSManager:
             print(f"Error cleaning up file {audio_path}: {e}")
 
 
-# Global TTS instance
-_tts_instance = None
+class TTSModelRegistry:
+    """Keeps several TTS models loaded under a memory budget, evicting the least recently used"""
+    
+    def __init__(self, memory_budget_bytes: int, device: Optional[str] = None):
+        """
+        Initialize the registry
+        
+        Args:
+            memory_budget_bytes: Maximum resident size of all loaded models
+            device: Device to run the models on ('cpu', 'cuda', or None for auto)
+        """
+        self.memory_budget_bytes = memory_budget_bytes
+        self.device = device
+        self._models: "OrderedDict[str, TTSManager]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per model name for the registry's lifetime: dropping it while a caller
+        # still waits on it would let a new caller load the same model alongside the waiter
+        self._load_locks: Dict[str, threading.Lock] = {}
+    
+    def get(self, model_name: str) -> TTSManager:
+        """
+        Return a loaded model, loading it at most once even under concurrent requests
+        
+        Args:
+            model_name: HuggingFace model name for TTS
+            
+        Returns:
+            TTSManager for the requested model
+        """
+        with self._lock:
+            manager = self._models.get(model_name)
+            if manager is not None:
+                self._models.move_to_end(model_name)
+                return manager
+            load_lock = self._load_locks.setdefault(model_name, threading.Lock())
+        
+        # Load outside the registry lock so other models stay available meanwhile
+        with load_lock:
+            with self._lock:
+                manager = self._models.get(model_name)
+                if manager is not None:
+                    self._models.move_to_end(model_name)
+                    return manager
+            
+            with span("tts.load", model=model_name):
+                manager = TTSManager(model_name, self.device)
+            
+            with self._lock:
+                # A failed load is returned but not kept, so the next request tries again
+                if manager.model is not None:
+                    self._models[model_name] = manager
+                    self._evict(keep=model_name)
+            return manager
+    
+    def _evict(self, keep: str):
+        """Evict least recently used models until the budget is met (caller holds the lock)"""
+        total = sum(m.memory_bytes() for m in self._models.values())
+        for name in list(self._models):
+            if total <= self.memory_budget_bytes:
+                break
+            if name == keep:
+                continue
+            manager = self._models.pop(name)
+            total -= manager.memory_bytes()
+            manager.unload()
+            print(f"Evicted TTS model: {name}")
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Resident memory (MB) and load latency (seconds) per loaded model, LRU first"""
+        with self._lock:
+            return {
+                name: {
+                    "memory_mb": manager.memory_bytes() / (1024 * 1024),
+                    "load_seconds": manager.load_seconds,
+                }
+                for name, manager in self._models.items()
+            }
+
+
+# Global TTS model registry
+TTS_MEMORY_BUDGET_MB = int(os.getenv("TTS_MEMORY_BUDGET_MB", 1024))
+_tts_registry = TTSModelRegistry(TTS_MEMORY_BUDGET_MB * 1024 * 1024)
 
 def get_tts_instance(model_name: str = "facebook/mms-tts-eng") -> TTSManager:
-    """Get or create a global TTS instance"""
-    global _tts_instance
-    if _tts_instance is None:
-        _tts_instance = TTSManager(model_name)
-    return _tts_instance
+    """Get the TTS instance for a model, loading it into the shared registry if needed"""
+    return _tts_registry.get(model_name)
+
+def get_tts_stats() -> Dict[str, Dict[str, float]]:
+    """Resident memory and load latency of the currently loaded TTS models"""
+    return _tts_registry.stats()
 
 def text_to_speech(text: str, model_name: str = "facebook/mms-tts-eng", play_audio: bool = True) -> Optional[str]:
     """
@@ -215,6 +335,160 @@ def text_to_speech(text: str, model_name: str = "facebook/mms-tts-eng", play_aud
     tts = get_tts_instance(model_name)
     return tts.speak(text, play_audio)
 
+class SentenceSplitter:
+    """Cuts complete sentences off a stream of text deltas as they arrive"""
+    
+    # A sentence ends at . ! ? (optionally followed by a quote or bracket) and whitespace, or at a line break
+    _BOUNDARY = re.compile(r'[.!?]+[)\]"]*\s+|\n+')
+    _ABBREVIATIONS = {"e.g.", "i.e.", "etc.", "vs.", "mr.", "mrs.", "ms.", "dr."}
+    # Only abbreviations before a number ("No. 5"); elsewhere they end a sentence ("The answer is no.")
+    _NUMBER_ABBREVIATIONS = {"no.", "nos."}
+    
+    def __init__(self, min_chars: int = 20):
+        """
+        Args:
+            min_chars: Fragments shorter than this are merged into the next sentence
+        """
+        self.min_chars = min_chars
+        self._buffer = ""
+    
+    def feed(self, delta: str) -> List[str]:
+        """
+        Append a text delta and return the sentences it completed
+        
+        Args:
+            delta: Newly streamed text
+            
+        Returns:
+            Complete, cleaned sentences ready for synthesis
+        """
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in self._BOUNDARY.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()]
+            if self._is_abbreviation(candidate, self._buffer[match.end():]):
+                continue
+            if len(candidate.strip()) < self.min_chars:
+                continue
+            sentences.append(candidate)
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return [c for c in (self.clean(s) for s in sentences) if c]
+    
+    def _is_abbreviation(self, candidate: str, following: str) -> bool:
+        """True if the candidate's final period belongs to an abbreviation rather than ending a sentence"""
+        words = candidate.split()
+        last_word = words[-1].lower().lstrip('("[') if words else ""
+        if last_word in self._ABBREVIATIONS:
+            return True
+        if last_word in self._NUMBER_ABBREVIATIONS:
+            # Until the next word has arrived we can't tell, so keep the text buffered
+            return not following or following[0].isdigit() or following[0] == "#"
+        return False
+    
+    def flush(self) -> List[str]:
+        """Return whatever text is left once the stream has ended"""
+        rest = self.clean(self._buffer)
+        self._buffer = ""
+        return [rest] if rest else []
+    
+    @staticmethod
+    def clean(text: str) -> str:
+        """Strip markdown emphasis and collapse whitespace"""
+        text = text.replace('**', '').replace('*', '').replace('#', '')
+        return ' '.join(text.split())
+
+
+class StreamingSpeaker:
+    """Synthesizes and plays sentences in order while the rest of the text is still being generated"""
+    
+    def __init__(self, model_name: str = "facebook/mms-tts-eng", play_audio: bool = True,
+                 start_time: Optional[float] = None):
+        """
+        Args:
+            model_name: HuggingFace model name for TTS
+            play_audio: Whether to play each sentence once it is synthesized
+            start_time: time.perf_counter() value the first-audio latency is measured from
+        """
+        self.model_name = model_name
+        self.play_audio = play_audio
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.first_audio_latency: Optional[float] = None
+        self.segments = 0
+        self._closed = False
+        self._text_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._audio_queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        # Synthesis of sentence N+1 overlaps with playback of sentence N
+        self._synth_thread = threading.Thread(target=self._synthesize_loop, daemon=True)
+        self._play_thread = threading.Thread(target=self._play_loop, daemon=True)
+        self._synth_thread.start()
+        self._play_thread.start()
+    
+    def feed(self, sentence: str):
+        """Queue a sentence for synthesis"""
+        if sentence:
+            self._text_queue.put(sentence)
+    
+    def close(self) -> int:
+        """
+        Wait until every queued sentence has been synthesized and played; safe to call more than once
+        
+        Returns:
+            Number of audio segments produced
+        """
+        if not self._closed:
+            self._closed = True
+            self._text_queue.put(None)
+        self._synth_thread.join()
+        self._play_thread.join()
+        return self.segments
+    
+    def _synthesize_loop(self):
+        try:
+            tts = get_tts_instance(self.model_name)
+            while True:
+                sentence = self._text_queue.get()
+                if sentence is None:
+                    return
+                fd, output_path = tempfile.mkstemp(prefix="tts_stream_", suffix=".wav")
+                os.close(fd)
+                audio_path = tts.text_to_speech(sentence, output_path)
+                if audio_path:
+                    self.segments += 1
+                    self._audio_queue.put(audio_path)
+                else:
+                    _remove(output_path)
+        except Exception as e:
+            print(f"Error in speech synthesis: {e}")
+        finally:
+            # The play loop (and so close()) only finishes once it gets the sentinel
+            self._audio_queue.put(None)
+    
+    def _play_loop(self):
+        tts = None
+        while True:
+            audio_path = self._audio_queue.get()
+            if audio_path is None:
+                return
+            try:
+                if self.first_audio_latency is None:
+                    self.first_audio_latency = time.perf_counter() - self.start_time
+                if self.play_audio:
+                    tts = tts or get_tts_instance(self.model_name)
+                    tts.play_audio(audio_path)
+            except Exception as e:
+                print(f"Error playing audio: {e}")
+            finally:
+                _remove(audio_path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
 # Example usage and testing
 if __name__ == "__main__":
     # Test the TTS functionality
@@ -227,3 +501,6 @@ if __name__ == "__main__":
         print(f"TTS test successful! Audio saved to: {audio_path}")
     else:
         print("TTS test failed!")
+    
+    for name, stats in get_tts_stats().items():
+        print(f"{name}: {stats['memory_mb']:.1f} MB resident, loaded in {stats['load_seconds']:.2f}s")
@@ -0,0 +1,362 @@
+"""
+Shared upstream client configuration and a resilient completion call layer
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import httpx
+import openai
+from dotenv import load_dotenv
+from shared.retry import is_retryable
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Connection pool sizing for the shared upstream client
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('UPSTREAM_MAX_CONNECTIONS', 100))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv('UPSTREAM_MAX_KEEPALIVE', 20))
+UPSTREAM_KEEPALIVE_EXPIRY = float(os.getenv('UPSTREAM_KEEPALIVE_EXPIRY', 30))
+UPSTREAM_TIMEOUT = float(os.getenv('UPSTREAM_TIMEOUT', 60))
+
+
+def load_config():
+    """Read MODEL, OPENAI_BASE_URL and OPENAI_API_KEY from the environment"""
+    model = os.getenv('MODEL')
+    base_url = os.getenv('OPENAI_BASE_URL')
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not model:
+        raise ValueError("MODEL is not set in .env file")
+    if not base_url:
+        raise ValueError("OPENAI_BASE_URL is not set in .env file")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY is not set in .env file")
+    return model, base_url, api_key
+
+
+def create_client(base_url, api_key, max_connections=UPSTREAM_MAX_CONNECTIONS,
+                  max_keepalive=UPSTREAM_MAX_KEEPALIVE, timeout=UPSTREAM_TIMEOUT, max_retries=2):
+    """
+    Create an OpenAI client backed by one pooled keep-alive HTTP client
+
+    The client is thread-safe; create it once per process and share it.
+
+    Args:
+        base_url: Upstream base URL
+        api_key: Upstream API key
+        max_connections: Maximum concurrent upstream connections
+        max_keepalive: Idle connections kept open for reuse
+        timeout: Request timeout in seconds
+        max_retries: Retries performed by the OpenAI client
+
+    Returns:
+        openai.OpenAI client
+    """
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(timeout, connect=min(10.0, timeout)),
+    )
+    return openai.OpenAI(base_url=base_url, api_key=api_key, http_client=http_client, max_retries=max_retries)
+
+
+# Per-turn latency budget shared by the turn's completion calls
+TURN_DEADLINE = float(os.getenv('TURN_DEADLINE', 60))
+# Fraction of the remaining budget the first completion may use, leaving time for the second
+FIRST_CALL_SHARE = float(os.getenv('FIRST_CALL_SHARE', 0.6))
+UPSTREAM_CALL_RETRIES = int(os.getenv('UPSTREAM_CALL_RETRIES', 2))
+# Set UPSTREAM_HEDGE=true to fire a duplicate request when the first is slower than the recent p95
+UPSTREAM_HEDGE = os.getenv('UPSTREAM_HEDGE', 'false').lower() in ('1', 'true', 'yes')
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+BREAKER_RESET_SECONDS = float(os.getenv('BREAKER_RESET_SECONDS', 15))
+
+
+class UpstreamUnavailable(Exception):
+    """Raised without calling the upstream: the circuit is open or the turn's deadline has passed"""
+
+
+class Deadline:
+    """A point in time by which a turn must finish"""
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the upstream is degraded.
+
+    closed: calls pass; `failure_threshold` consecutive failures open the circuit.
+    open: calls are rejected until `reset_seconds` have passed.
+    half_open: one probe call passes; its success closes the circuit, its failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may be sent now"""
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = "half_open"
+                self._probing = False
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def release(self):
+        """End a call that says nothing about the upstream's health: frees the probe slot, keeps the state"""
+        with self._lock:
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+
+class LatencyWindow:
+    """Rolling window of recent successful call latencies"""
+
+    def __init__(self, size=200, min_samples=20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def p95(self):
+        """95th percentile of the window, or None until enough samples were seen"""
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class ResilientCaller:
+    """Completion calls with per-call timeouts, jittered exponential backoff, hedging and a circuit breaker"""
+
+    def __init__(self, max_retries=UPSTREAM_CALL_RETRIES, base_delay=0.25, max_delay=4.0, hedge=UPSTREAM_HEDGE,
+                 min_hedge_delay=0.05, breaker=None, latencies=None):
+        """
+        Args:
+            max_retries: Retries of transient failures per call
+            base_delay: First backoff delay in seconds (doubled per attempt, with full jitter)
+            max_delay: Largest backoff delay in seconds
+            hedge: Fire a duplicate request once a call runs longer than the recent p95
+            min_hedge_delay: Never hedge earlier than this many seconds
+            breaker: Circuit breaker shared by every call (a new one by default)
+            latencies: {streamed: LatencyWindow} replacing the default windows used for the hedge delay;
+                streamed calls are timed to the response headers, others to the full response
+        """
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = {False: LatencyWindow(), True: LatencyWindow()}
+        self.latencies.update(latencies or {})
+        # hedge_discarded_tokens: tokens billed for hedged responses that lost the race (not in the usage ledger)
+        self.counters = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "hedge_discarded_tokens": 0,
+                         "rejected": 0}
+        self._counter_lock = threading.Lock()
+        self._executor = None
+
+    def _count(self, name, amount=1):
+        with self._counter_lock:
+            self.counters[name] += amount
+
+    def stats(self):
+        with self._counter_lock:
+            return dict(self.counters, breaker=self.breaker.state, p95_seconds=self.latencies[False].p95(),
+                        stream_p95_seconds=self.latencies[True].p95())
+
+    def call(self, client, deadline, share=1.0, **kwargs):
+        """
+        Run client.chat.completions.create(**kwargs) within `share` of the deadline's remaining time
+
+        A stream must also be read to the end within that time; iterating past it raises openai.APITimeoutError.
+
+        Raises:
+            UpstreamUnavailable: if the circuit is open or no time is left
+            openai.APIError: the last error once retries are exhausted or for non-transient errors
+        """
+        call_deadline = Deadline(deadline.remaining() * share)
+        latencies = self.latencies[bool(kwargs.get("stream"))]
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            timeout = call_deadline.remaining()
+            if timeout <= 0:
+                raise UpstreamUnavailable("The request took too long, please try again")
+            if not self.breaker.allow():
+                self._count("rejected")
+                raise UpstreamUnavailable("The upstream model is unavailable right now, please try again shortly")
+
+            start = time.monotonic()
+            try:
+                response = self._attempt(client, timeout, latencies, kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # A bad request says nothing about the upstream's health, so it must not close the circuit
+                    self.breaker.release()
+                    raise
+                self.breaker.failure()
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt == self.max_retries or delay >= call_deadline.remaining():
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            self.breaker.success()
+            latencies.add(time.monotonic() - start)
+            if kwargs.get("stream"):
+                # The timeout above only bounds the wait for the response headers, not the body
+                return DeadlineStream(response, call_deadline)
+            return response
+
+    def _attempt(self, client, timeout, latencies, kwargs):
+        # The caller does the retrying, so the client must not retry on its own
+        with_options = getattr(client, "with_options", None)
+        if with_options:
+            client = with_options(timeout=timeout, max_retries=0)
+
+        hedge_delay = latencies.p95() if self.hedge else None
+        if hedge_delay is None or hedge_delay >= timeout:
+            return client.chat.completions.create(**kwargs)
+        return self._hedged(client, max(hedge_delay, self.min_hedge_delay), timeout, kwargs)
+
+    def _hedged(self, client, hedge_delay, timeout, kwargs):
+        """Send the request, send a duplicate if it is slower than `hedge_delay`, and return the first success"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=UPSTREAM_MAX_CONNECTIONS, thread_name_prefix="hedge")
+        deadline = Deadline(timeout)
+        create = lambda: client.chat.completions.create(**kwargs)
+        primary = self._executor.submit(create)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        backup = self._executor.submit(create)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count("hedge_wins")
+                    self._abandon({primary, backup} - {future})
+                    return future.result()
+                error = future.exception()
+        self._abandon(pending)
+        if error is not None:
+            raise error
+        raise openai.APITimeoutError(request=httpx.Request("POST", str(getattr(client, "base_url", ""))))
+
+
+    def _abandon(self, futures):
+        """Cancel requests that have not started and discard the responses of the rest once they arrive"""
+        for future in futures:
+            future.cancel()
+            future.add_done_callback(self._discard)
+
+    def _discard(self, future):
+        """Count the tokens an abandoned response was billed for and close it (streams)"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        self._count("hedge_discarded_tokens", getattr(getattr(result, "usage", None), "total_tokens", 0) or 0)
+        if hasattr(result, "close"):
+            result.close()
+
+
+class DeadlineStream:
+    """Iterates a completion stream, closing it and raising openai.APITimeoutError once the deadline passes"""
+
+    def __init__(self, stream, deadline):
+        self._stream = stream
+        self._chunks = iter(stream)
+        self.deadline = deadline
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._stream, name)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self._check()
+        chunk = next(self._chunks)
+        # The chunk may have taken until after the deadline to arrive
+        self._check()
+        return chunk
+
+    def _check(self):
+        if self.deadline.remaining() <= 0:
+            self.close()
+            raise openai.APITimeoutError(request=httpx.Request("POST", "chat/completions"))
+
+    def close(self):
+        if hasattr(self._stream, "close"):
+            self._stream.close()
+
+
+class ResilientClient:
+    """
+    Stands in for an OpenAI client for one turn: every chat.completions.create()
+    goes through a ResilientCaller, the first call within FIRST_CALL_SHARE of
+    the turn's deadline and later calls within whatever remains.
+    """
+
+    def __init__(self, client, caller, deadline, first_share=FIRST_CALL_SHARE):
+        self._client = client
+        self.caller = caller
+        self.deadline = deadline
+        self.first_share = first_share
+        self._calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        share = self.first_share if self._calls == 0 else 1.0
+        self._calls += 1
+        return self.caller.call(self._client, self.deadline, share, **kwargs)
+
+
+# Per-process caller shared by every conversation, so the breaker and latency window see all traffic
+resilient_caller = ResilientCaller()
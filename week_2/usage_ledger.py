@@ -0,0 +1,124 @@
+"""
+Token accounting ledger built from completion `usage`, with per-session budgets
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Dict, Iterable, Optional
+
+
+def _empty_totals() -> Dict[str, int]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0, "total_tokens": 0}
+
+
+class UsageLedger:
+    """Records token usage of every completion call and aggregates it by session, model and tool"""
+
+    def __init__(self, session_budget_tokens: int = 0, max_entries: int = 10000, max_sessions: int = 10000):
+        """
+        Args:
+            session_budget_tokens: Maximum total tokens per session (0 = unlimited)
+            max_entries: Number of individual call records kept for inspection
+            max_sessions: Sessions whose totals are kept; the least recently active are forgotten beyond that
+        """
+        self.session_budget_tokens = session_budget_tokens
+        self.max_sessions = max_sessions
+        self.entries = deque(maxlen=max_entries)
+        self._totals = {
+            # Least recently active first, so a long-running server doesn't keep every session ever seen
+            "session": OrderedDict(),
+            "model": defaultdict(_empty_totals),
+            "tool": defaultdict(_empty_totals),
+            "stage": defaultdict(_empty_totals),
+        }
+        self._lock = threading.Lock()
+
+    def record(self, session_id: str, model: str, stage: str, usage, tools: Iterable[str] = (),
+               history_messages: int = 0, history_tokens: int = 0) -> Dict:
+        """
+        Record one completion call
+
+        Args:
+            session_id: Conversation the call belongs to
+            model: Model name
+            stage: "first" (tool selection / direct answer) or "second" (tool round trip)
+            usage: `response.usage` from the completion (may be None)
+            tools: Tools the call selected or answered for
+            history_messages: Messages sent with the call
+            history_tokens: Estimated tokens of those messages
+
+        Returns:
+            The recorded entry
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        tools = list(tools)
+
+        entry = {
+            "ts": time.time(),
+            "session_id": session_id,
+            "model": model,
+            "stage": stage,
+            "tools": tools,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached_tokens,
+            "history_messages": history_messages,
+            "history_tokens": history_tokens,
+        }
+
+        with self._lock:
+            self.entries.append(entry)
+            sessions = self._totals["session"]
+            if session_id in sessions:
+                sessions.move_to_end(session_id)
+            else:
+                sessions[session_id] = _empty_totals()
+                while len(sessions) > self.max_sessions:
+                    sessions.popitem(last=False)
+            keys = [("model", model), ("stage", stage)] + [("tool", tool) for tool in tools]
+            for totals in [sessions[session_id]] + [self._totals[dimension][key] for dimension, key in keys]:
+                totals["calls"] += 1
+                totals["prompt_tokens"] += prompt_tokens
+                totals["completion_tokens"] += completion_tokens
+                totals["cached_tokens"] += cached_tokens
+                totals["total_tokens"] += prompt_tokens + completion_tokens
+        return entry
+
+    def totals(self, by: str = "session") -> Dict[str, Dict[str, int]]:
+        """Token totals grouped by "session", "model", "tool" or "stage" """
+        with self._lock:
+            return {key: dict(value) for key, value in self._totals[by].items()}
+
+    def session_tokens(self, session_id: str) -> int:
+        """Total tokens spent so far by a session"""
+        with self._lock:
+            totals = self._totals["session"].get(session_id)
+            return totals["total_tokens"] if totals else 0
+
+    def check_budget(self, session_id: str, estimated_tokens: int) -> Optional[str]:
+        """
+        Check whether a request fits in the session budget before it is sent
+
+        Args:
+            session_id: Conversation making the request
+            estimated_tokens: Estimated prompt tokens of the request
+
+        Returns:
+            An error message if the budget would be exceeded, None otherwise
+        """
+        if not self.session_budget_tokens:
+            return None
+        spent = self.session_tokens(session_id)
+        if spent + estimated_tokens > self.session_budget_tokens:
+            return (f"Error: This conversation has used {spent} of its {self.session_budget_tokens} token budget "
+                    f"and the next request needs about {estimated_tokens} more. Please start a new conversation.")
+        return None
+
+
+# Per-process ledger shared by every conversation
+ledger = UsageLedger(int(os.getenv('SESSION_TOKEN_BUDGET', 0)),
+                     max_sessions=int(os.getenv('USAGE_MAX_SESSIONS', 10000)))